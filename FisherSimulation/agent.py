@@ -25,7 +25,7 @@ class CommunicatingAgent(IdentifyingAgent):
     # directory so it can be looked up later.
     def register(self, directory, type=None, voting=False):
         self._directory = directory
-        self._message_log = []
+        self._message_log = directory.new_message_log()
         directory.register_communicating_agent(self, type, voting)
     
     def get_directory(self):
@@ -35,26 +35,27 @@ class CommunicatingAgent(IdentifyingAgent):
         
     def send_message(self, recipient, message):
         self.get_directory().send_message(message)
-        self._message_log.append({
-            "direction": "sent",
-            "time": self.get_directory().get_system_time(),
-            "sender": self.get_id(),
-            "recipient": message.metainfo.target,
-            "contents": message
-        })        
+        self._log_message(
+            "sent", self.get_id(), message.metainfo.target, message
+        )
         
     def broadcast_message(self, message):
         self.get_directory().broadcast_message(message)
         
     def receive_message(self, sender, message):
+        self._log_message("received", sender, self.get_id(), message)
+        message.reaction(self)        
+
+    def _log_message(self, direction, sender, recipient, message):
+        if not self._message_log.keeps_entries():
+            return
         self._message_log.append({
-            "direction": "received",
+            "direction": direction,
             "time": self.get_directory().get_system_time(),
             "sender": sender,
-            "recipient": self.get_id(),
+            "recipient": recipient,
             "contents": message
         })
-        message.reaction(self)        
         
 class VotingAgent(CommunicatingAgent):
     def decide_vote(self, target_message):
@@ -94,6 +95,9 @@ class PrioritizingAgent(object):
     
     def set_priorities(self, p):
         self._priorities = p
+        
+    def get_priorities(self):
+        return self._priorities
     
     # Weighted average of priority values
     def get_priorities_satisfaction(self, influences):
@@ -102,7 +106,7 @@ class PrioritizingAgent(object):
         #print "Priorities for %s" % str(self.get_id())
         for p in self._priorities:
             w = self._priorities[p]
-            value = p.calculate_value(influences)
+            value = influences.value_of(p)
             #print "\t%s: %f" % (p.name, value)
             s += value * w
             t += w
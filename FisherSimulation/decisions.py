@@ -26,6 +26,20 @@ class VotingDecisionMechanism(object):
 
         raise NotImplementedError()
 
+    @classmethod
+    def prepare_hearing(cls, agents, coastal_plan, world_map):
+        """Called once per hearing, before any votes are decided, with all
+        the voting agents. Mechanisms may use it to evaluate every agent that
+        uses them at once. The default does nothing.
+
+        Arguments:
+            agents:         A list of all the voting agents
+            coastal_plan:   The plan.CoastalPlan instance of the hearing
+            world_map:      A world.Map instance
+        """
+
+        pass
+
     @classmethod
     def new(cls, agent, config, world):
         """Add an instance of this mechanism to the given agent.
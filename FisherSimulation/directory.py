@@ -1,24 +1,101 @@
+import collections
+import itertools
 import entities
 
+class MessageLog(object):
+    """A message history with a retention policy.
+
+    Policies:
+        "all":      Every entry is kept. This is the default.
+        "off":      No entries are kept.
+        "ring":     Only the last <size> entries are kept.
+        "phase":    Entries are kept until the log is cleared, which the
+                    directory does when a phase starts recording.
+    """
+
+    POLICIES = ("all", "off", "ring", "phase")
+
+    def __init__(self, policy="all", size=None):
+        assert policy in MessageLog.POLICIES, \
+            "Unknown message history policy: %s" % policy
+        assert policy != "ring" or size > 0, \
+            "Ring message history needs a positive size."
+        self.policy = policy
+        self.size = size
+        self._entries = collections.deque(maxlen=size) if policy == "ring" \
+            else []
+        self._count = 0
+
+    def keeps_entries(self):
+        return self.policy != "off"
+
+    def append(self, entry):
+        self._count += 1
+        if self.keeps_entries():
+            self._entries.append(entry)
+
+    def clear(self):
+        if self.policy == "ring":
+            self._entries.clear()
+        else:
+            self._entries = []
+
+    def count(self):
+        """Returns the number of entries ever appended, kept or not."""
+        return self._count
+
+    def since(self, count):
+        """Returns the kept entries that were appended after <count> entries
+        had been appended."""
+        n = min(self._count - count, len(self._entries))
+        if n <= 0:
+            return []
+        return list(itertools.islice(
+            self._entries, len(self._entries) - n, None
+        ))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
 class Directory(object):
-    def __init__(self):
+    def __init__(self, history="all", history_size=None):
         self._catalogue = []
-        self._log = []
+        self._members = set()
+        self._by_type = {}      # agent type to list of agents
+        self._voters = []
+        self._views = {}        # (type, only_voters) to tuple of agents
+        self._log = MessageLog(history, history_size)
+        self._agent_logs = []
         self._messages_sent = 0   
         self._live_print_messages = False
         self._recording = None
         
     def start_recording(self):
-        self._recording = len(self._log)
+        if self._log.policy == "phase":
+            self._log.clear()
+            for log in self._agent_logs:
+                log.clear()
+        self._recording = self._log.count()
         
     def stop_recording(self):
         assert self._recording is not None, "No recording ongoing"
-        recording = self._log[self._recording:]
+        recording = self._log.since(self._recording)
         self._recording = None
         return recording
+
+    def new_message_log(self):
+        """Creates a message log for an agent, with the same retention policy
+        as the directory's own log."""
+        log = MessageLog(self._log.policy, self._log.size)
+        if log.policy == "phase":
+            self._agent_logs.append(log)
+        return log
         
     def in_catalogue(self, agent):
-        return agent in [a for a, _, __ in self._catalogue]
+        return agent in self._members
         
     def process_message(self, message):
         message.metainfo.timestmap = self.get_system_time()
@@ -53,18 +130,51 @@ class Directory(object):
         
     def register_communicating_agent(self, agent, type, voting=False):
         self._catalogue.append((agent, type, voting))
+        self._members.add(agent)
+        self._by_type.setdefault(type, []).append(agent)
+        if voting:
+            self._voters.append(agent)
+        self._views = {}
+
+    def unregister_communicating_agent(self, agent):
+        self._catalogue = [e for e in self._catalogue if not e[0] is agent]
+        self._members.discard(agent)
+        for agents in self._by_type.values():
+            if agent in agents:
+                agents.remove(agent)
+        if agent in self._voters:
+            self._voters.remove(agent)
+        self._views = {}
         
     def get_voting_agents(self):
         return self.get_agents(only_voters=True)        
         
     def get_agents(self, type=None, exclude=None, only_voters=False, 
             predicate=None):
-        return [a for a, t, v in self._catalogue if 
-            (type is None or t == type) and 
+        agents = self._get_view(type, only_voters)
+        if exclude is None and predicate is None:
+            return agents
+        return tuple(a for a in agents if
             (exclude is None or not a == exclude) and
-            (not only_voters or v) and
             (predicate is None or predicate(a))
-        ]
+        )
+
+    def _get_view(self, type, only_voters):
+        """Returns a cached tuple of the registered agents of the given type
+        (or all types if None), in registration order. The cache is cleared
+        whenever an agent registers or unregisters."""
+        key = (type, only_voters)
+        if not key in self._views:
+            if type is None:
+                agents = self._voters if only_voters else \
+                    [a for a, _, __ in self._catalogue]
+            else:
+                agents = self._by_type.get(type, [])
+                if only_voters:
+                    voters = set(self._voters)
+                    agents = [a for a in agents if a in voters]
+            self._views[key] = tuple(agents)
+        return self._views[key]
         
     def get_municipality(self):
         muns = self.get_agents(type = entities.Municipality)
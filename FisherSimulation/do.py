@@ -31,7 +31,7 @@ class Complaint(object):
             vote:  A vote.Vote instance
         """
         obj = c()
-        obj.coordinates = world.get_structure().get_cell_position(vote.cell)
+        obj.coordinates = vote.cell.get_position(world)
         obj.agent_id = agent.get_id()
         return obj
 
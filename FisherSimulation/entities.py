@@ -1,6 +1,8 @@
 """Defines the concrete entities used in the simulation."""
 
 import random
+import heapq
+import itertools
 
 from FisherSimulation.agent import VotingAgent
 from FisherSimulation.agent import PrioritizingAgent
@@ -35,11 +37,96 @@ class AgentFactory(object):
     def civilian(self):
         return self.Civilian(self._directory, self._cfg["civilian"])
 
+class SlotKnowledge(dict):
+    """Maps cells to their known fishing quality (float or None), and keeps a
+    heap of the cells ordered by quality.
+
+    Heap entries are removed lazily. An entry is stale once its cell has been
+    given a new value, and a blocked cell is dropped when it reaches the top,
+    since cells are never unblocked. The heap is rebuilt when stale entries
+    make up most of it.
+    """
+
+    def __init__(self, dictionary=None):
+        dict.__init__(self)
+        self.version = 0    # incremented on every change
+        self._heap = []
+        self._entries = {}  # cell to sequence number of its current entry
+        self._sequence = itertools.count()
+        for key in dictionary or {}:
+            self[key] = dictionary[key]
+
+    def __setitem__(self, cell, quality):
+        dict.__setitem__(self, cell, quality)
+        self.version += 1
+        self._push(cell, quality)
+        if len(self._heap) > 2 * len(self) + 16:
+            self._rebuild()
+
+    def __delitem__(self, cell):
+        dict.__delitem__(self, cell)
+        del self._entries[cell]
+        self.version += 1
+
+    # The other mutating dict methods would bypass the heap bookkeeping
+
+    def update(self, *args, **kwargs):
+        for cell, quality in dict(*args, **kwargs).iteritems():
+            self[cell] = quality
+
+    def setdefault(self, cell, quality=None):
+        if not cell in self:
+            self[cell] = quality
+        return self[cell]
+
+    def pop(self, cell, *default):
+        if not cell in self:
+            return dict.pop(self, cell, *default)
+        quality = self[cell]
+        del self[cell]
+        return quality
+
+    def popitem(self):
+        cell, quality = dict.popitem(self)
+        del self._entries[cell]
+        self.version += 1
+        return cell, quality
+
+    def clear(self):
+        dict.clear(self)
+        self._entries.clear()
+        self._heap = []
+        self.version += 1
+
+    def _push(self, cell, quality):
+        number = next(self._sequence)
+        self._entries[cell] = number
+        heapq.heappush(self._heap, (-(quality or 0), number, cell))
+
+    def _rebuild(self):
+        self._heap = []
+        for cell in self._entries.keys():
+            if not cell.is_blocked():
+                self._push(cell, self[cell])
+
+    def best_unblocked(self):
+        """Finds the known cell with the best quality that is not blocked.
+
+        Returns:
+            A world.Slot instance, or None if all known cells are blocked.
+        """
+        while self._heap:
+            __, number, cell = self._heap[0]
+            if self._entries.get(cell) == number and not cell.is_blocked():
+                return cell
+            heapq.heappop(self._heap)
+        return None
+
 class ProducedAgent(VotingAgent, PrioritizingAgent, WorkingAgent):
     """Base class for aquaculture, fisherman, civilian and tourist agents.
 
     Attributes:
-        slot_knowledge:     A dictionary mapping of cell to fishing quality
+        slot_knowledge:     A SlotKnowledge mapping of cell to fishing quality
                             (float).
         decision_mechanism: An object implementing the
                             vote.VotingDecisionMechanism interface.
@@ -52,7 +139,7 @@ class ProducedAgent(VotingAgent, PrioritizingAgent, WorkingAgent):
         self.register(directory, self.__class__, voting=True)
         self.set_priorities(cfg["priorities"])
         self.capital = 0
-        self.slot_knowledge = {}
+        self.slot_knowledge = SlotKnowledge()
         self.decision_mechanism = None
         self._guess_mean = 0.6
         self._num_max_complaints = cfg.globals["num max complaints"]
@@ -109,12 +196,12 @@ class AquacultureSpawner(object):
         self._aquaculture_in_blocked = aquaculture_in_blocked
         self.config = config
 
-    def choose_cell(self, plan):
+    def choose_cell(self, coastal_plan):
         # Maybe it should choose the best cell based on public information
-        sites = plan.aquaculture_sites() if self._aquaculture_in_blocked \
-            else [c for c in plan.aquaculture_sites() if not c.is_blocked()]
+        if not self._aquaculture_in_blocked:
+            return coastal_plan.random_unblocked(plan.AQUACULTURE_SITE)
         try:
-            return random.choice(sites)
+            return random.choice(coastal_plan.aquaculture_sites())
         except IndexError:  # no aquaculture sites left
             return None
 
@@ -272,32 +359,13 @@ class Fisherman(ProducedAgent):
         self.slot_knowledge[home_cell] = home_cell.get_fishing_efficiency()
 
     def find_fishing_spot(self, world):
-        sorted_known = sorted(
-            self.slot_knowledge.iterkeys(),
-            key = lambda k: self.slot_knowledge[k] or 0,
-            reverse=True
-        )
-
-        #print self.first_home in sorted_known
-        #print self.slot_knowledge[self.first_home]
-        #print [(c,self.slot_knowledge[c]) for c in sorted_known]
-
-        all_cells = world.get_all_cells()
-        shuffled_world = random.sample(all_cells, len(all_cells))
-
-        cell = next(
-            (cell for cell in sorted_known if not cell.is_blocked()),
-            None
-        )
+        cell = self.slot_knowledge.best_unblocked()
 
         if cell is None or self.slot_knowledge[cell] < 0.5: # base value
             # If we have no knowledge of any unblocked cells, OR
             # every cell has a known output lower than 0.5, try a different
             # cell in the world.
-            cell = next(
-                (cell for cell in shuffled_world if not cell.is_blocked()),
-                None
-            )
+            cell = world.get_random_free_cell()
 
         if not cell is None:
             # change home
@@ -1,5 +1,6 @@
 import nn
 import math
+import binascii
 import numpy
 import priority
 import agent
@@ -29,6 +30,7 @@ class Evolution(LearningMechanism):
         self._genotype = config.genotype
         self._elitism = config.elitism
         self.selection_mechanism = config.selection_mechanism
+        self.mating_scheme = config.mating_scheme
         self._crossover_rate = config.crossover_rate
         self._mutation_rate = config.mutation_rate
         self._genome_mutation_rate = config.genome_mutation_rate
@@ -53,7 +55,7 @@ class Evolution(LearningMechanism):
         genotypes = [p.phenotype.genotype for p in selected]
         
         ## crossover
-        for (a, b) in itertools.combinations(range(len(genotypes)), 2):
+        for (a, b) in self.mating_scheme(len(genotypes)):
             genotypes[a], genotypes[b] = self._genotype.crossover(
                 genotypes[a], genotypes[b], self._crossover_rate
             )
@@ -69,6 +71,52 @@ class Evolution(LearningMechanism):
         for (__, ___, a), p in zip(rest, new_phenotypes):
             a.add_voting_mechanism(p)
     
+    @staticmethod
+    def random_pairs(num):
+        """Shuffles <num> parents into disjoint pairs. With an odd number of 
+        parents the one left over is not paired.
+        
+        Returns:
+            A list of (a, b) index pairs
+        """
+        order = range(num)
+        random.shuffle(order)
+        return zip(order[0::2], order[1::2])
+    
+    @staticmethod
+    def all_pairs(num):
+        """Pairs every parent with every other parent, in O(n^2) pairs."""
+        return itertools.combinations(xrange(num), 2)
+    
+    @staticmethod
+    def select_cumulative(sorted_phenotypes, cumulative, points):
+        """Selects the phenotypes whose slice of the cumulative weights each
+        point falls into.
+        
+        Arguments:
+            sorted_phenotypes:  Phenotypes, ordered from lowest to highest 
+                                fitness
+            cumulative:         Array of cumulative selection weights, one for
+                                each phenotype
+            points:             Array of points in [0, cumulative[-1])
+            
+        Returns:
+            A list of the selected phenotypes, one for each point
+        """
+        indices = numpy.searchsorted(cumulative, points, side="right")
+        return [sorted_phenotypes[i] for i in indices.tolist()]
+    
+    @staticmethod
+    def rank_weights(num):
+        """Cumulative linear rank weights: 1 ``lottery ticket'' for the lowest
+        ranking of <num> members, 2 for the second and so on up to <num> 
+        tickets for the best member."""
+        return numpy.cumsum(numpy.arange(1, num + 1, dtype=float))
+    
+    @staticmethod
+    def random_points(total, num):
+        return numpy.array([random.random() for _ in xrange(num)]) * total
+    
     @staticmethod
     def rank_selection(sorted_phenotypes, num):
         """Linear rank selection.
@@ -79,32 +127,86 @@ class Evolution(LearningMechanism):
         tickets.
         
         Arguments:
-            sorted_phenotypes:  TODO
-            num:                TODO
+            sorted_phenotypes:  Phenotypes, ordered from lowest to highest 
+                                fitness
+            num:                Number of phenotypes to select
             
         Returns:
-            TODO
+            A list of <num> selected phenotypes
         """
+        if num <= 0 or not sorted_phenotypes: return []
+        cumulative = Evolution.rank_weights(len(sorted_phenotypes))
+        return Evolution.select_cumulative(
+            sorted_phenotypes, 
+            cumulative, 
+            Evolution.random_points(cumulative[-1], num)
+        )
+    
+    @staticmethod
+    def stochastic_universal_sampling(sorted_phenotypes, num):
+        """Linear rank selection by stochastic universal sampling. Uses the 
+        same lottery tickets as rank selection, but selects at <num> evenly
+        spaced points from a single random offset, so that the number of times
+        each member is selected stays close to its expected value.
         
-        wheel = {}
-        sum = 0
-        total = 0
-        for n in xrange(len(sorted_phenotypes)):
-            wheel[sorted_phenotypes[-n]] = n + sum
-            sum += n
-            total += n + sum
-        selected = [None] * num
-        for i in xrange(num):
-            r = random.random() * total        
-            for p in wheel:
-                if r > wheel[p]:
-                    selected[i] = p
-        return selected
+        Arguments:
+            sorted_phenotypes:  Phenotypes, ordered from lowest to highest 
+                                fitness
+            num:                Number of phenotypes to select
+            
+        Returns:
+            A list of <num> selected phenotypes
+        """
+        if num <= 0 or not sorted_phenotypes: return []
+        cumulative = Evolution.rank_weights(len(sorted_phenotypes))
+        step = cumulative[-1] / num
+        return Evolution.select_cumulative(
+            sorted_phenotypes, 
+            cumulative, 
+            (random.random() + numpy.arange(num)) * step
+        )
+    
+    @staticmethod
+    def tournament_selection(sorted_phenotypes, num, size=2):
+        """Tournament selection. Each selection is the fittest of <size> 
+        members drawn uniformly with replacement. The best of <size> draws has
+        rank at most i with probability (i / N) ** size, so the tournaments are
+        run by sampling from those cumulative weights instead of drawing every
+        contestant.
+        
+        Arguments:
+            sorted_phenotypes:  Phenotypes, ordered from lowest to highest 
+                                fitness
+            num:                Number of phenotypes to select
+            size:               Number of members in each tournament
+            
+        Returns:
+            A list of <num> selected phenotypes
+        """
+        if num <= 0 or not sorted_phenotypes: return []
+        n = len(sorted_phenotypes)
+        cumulative = (numpy.arange(1, n + 1, dtype=float) / n) ** size
+        return Evolution.select_cumulative(
+            sorted_phenotypes, 
+            cumulative, 
+            Evolution.random_points(1.0, num)
+        )
         
 class EvolutionConfig(object):
+    MATING_SCHEMES = {
+        "random pairs": Evolution.random_pairs,
+        "all pairs": Evolution.all_pairs,
+        "default": Evolution.all_pairs
+    }
+    
     SELECTION_MECHANISMS = {
         "rank": Evolution.rank_selection,
         "rank selection": Evolution.rank_selection,
+        "sus": Evolution.stochastic_universal_sampling,
+        "stochastic universal sampling": 
+            Evolution.stochastic_universal_sampling,
+        "tournament": Evolution.tournament_selection,
+        "tournament selection": Evolution.tournament_selection,
         "default": Evolution.rank_selection
     }
     
@@ -118,6 +220,14 @@ class EvolutionConfig(object):
             dict["selection mechanism"], 
             EvolutionConfig.SELECTION_MECHANISMS["default"]
         )
+        if obj.selection_mechanism is Evolution.tournament_selection:
+            size = int(dict.get("tournament size", 2))
+            obj.selection_mechanism = lambda phenotypes, num: \
+                Evolution.tournament_selection(phenotypes, num, size)
+        obj.mating_scheme = EvolutionConfig.MATING_SCHEMES.get(
+            dict.get("mating scheme"), 
+            EvolutionConfig.MATING_SCHEMES["default"]
+        )
         obj.crossover_rate = float(dict["crossover rate"])
         obj.mutation_rate = float(dict["mutation rate"])
         obj.genome_mutation_rate = float(dict["genome mutation rate"])
@@ -132,21 +242,52 @@ class Phenotype(object):
         return c(genotype)
     
 class Genotype(object):
+    """A genome of <length> bits, packed into a Python integer. The first bit
+    of the genome is the most significant bit of the integer.
+    """
+
     length = 0
 
     def __init__(self, genome):
         self.genome = genome
+
+    @classmethod
+    def from_bits(c, bits):
+        """Creates a genotype from a sequence of bits, such as "0" and "1"
+        strings or integers."""
+        return c(int("".join(str(int(b)) for b in bits) or "0", 2))
+
+    def to_bit_string(self):
+        return format(self.genome, "0%db" % self.length) if self.length else ""
+
+    def to_bit_array(self):
+        """Returns the genome as a NumPy uint8 array of 0 and 1 values."""
+        num_bytes = (self.length + 7) / 8
+        packed = numpy.frombuffer(
+            binascii.unhexlify("%0*x" % (2 * num_bytes, self.genome)),
+            dtype=numpy.uint8
+        )
+        return numpy.unpackbits(packed)[8 * num_bytes - self.length:]
+
+    def to_unsigned_array(self, width):
+        """Splits the genome into unsigned integers of <width> bits each,
+        dropping any bits left over at the end.
+
+        Returns:
+            A NumPy array of integers.
+        """
+        num = self.length / width
+        bits = self.to_bit_array()[:num * width].reshape(num, width)
+        return bits.dot(2 ** numpy.arange(width - 1, -1, -1))
     
     @classmethod
     def random(c):
-        return c(
-            ["0" if random.random() > 0.5 else "1" for __ in xrange(c.length)]
-        )
+        return c(random.getrandbits(c.length) if c.length > 0 else 0)
         
     def mutate(self, mutation_rate, genome_mutation_rate):
         if random.random() < mutation_rate:
-            point = int(random.random() * len(self.genome))
-            self.genome[point] = "0" if self.genome[point] == "1" else "1"
+            point = int(random.random() * self.length)
+            self.genome ^= 1 << (self.length - 1 - point)
         
     def __len__(self):
         return self.length
@@ -155,9 +296,10 @@ class Genotype(object):
     def crossover(c, first, second, crossover_rate):
         assert len(first) == len(second), "Lengths are not the same."
         point = int(random.random() * len(first))
+        tail = (1 << (len(first) - point)) - 1     # bits from point onwards
         return (
-            c(first.genome[:point] + second.genome[point:]),
-            c(second.genome[:point] + first.genome[point:])
+            c(first.genome & ~tail | second.genome & tail),
+            c(second.genome & ~tail | first.genome & tail)
         ) if random.random() < crossover_rate else (first, second)
             
 # Concrete decision making
@@ -182,9 +324,9 @@ class FishermanVotingRules(decisions.VotingDecisionMechanism, Phenotype):
     
     def _dist_prob(self, agent, coastal_plan, world_map, num_max_complaints):
         vote_strength = {}
+        distances = world_map.get_normalized_distances_from(agent.home)
         for cell in coastal_plan.aquaculture_sites():
-            norm_distance = world_map.get_cell_distance(agent.home, cell) / \
-                world_map.get_max_distance()
+            norm_distance = float(distances[cell.get_position(world_map)])
             value = random.random() * norm_distance
             complain = value > 0.5
             if complain:
@@ -227,7 +369,7 @@ class FishermanRulesGenotype(Genotype):
             1: FishermanVotingRules.COMPLAIN_10,
             2: FishermanVotingRules.APPROVE_ALL,
             3: FishermanVotingRules.DIST_PROB
-        }[int("".join(self.genome), 2) / 2]
+        }[self.genome / 2]
 
             
 class FishermanVotingNN(decisions.VotingDecisionMechanism, Phenotype):
@@ -239,55 +381,119 @@ class FishermanVotingNN(decisions.VotingDecisionMechanism, Phenotype):
             "targeted conditions"]
     hiddens = ["A", "B", "C", "D", "E", "F"]
     outputs = ["vote"]
+    connections = [
+        # All inputs to all hidden neurons
+        (a, b) for a in inputs for b in hiddens       
+    ] + [
+        # All hidden neurons to all output neurons
+        (a, b) for a in hiddens for b in outputs
+    ] + [
+        # All hidden neurons to themselves
+        (a, a) for a in hiddens
+    ] + [
+        # Bias node to hidden layer nodes
+        ("bias", a) for a in hiddens
+    ]
 
     def __init__(self, genotype):
         Phenotype.__init__(self, genotype)        
-        self.connections = [
-            # All inputs to all hidden neurons
-            (a, b) for a in self.inputs for b in self.hiddens       
-        ] + [
-            # All hidden neurons to all output neurons
-            (a, b) for a in self.hiddens for b in self.outputs
-        ] + [
-            # All hidden neurons to themselves
-            (a, a) for a in self.hiddens
-        ] + [
-            # Bias node to hidden layer nodes
-            ("bias", a) for a in self.hiddens
-        ]
         self.edges = zip(self.connections, self.genotype.to_number_list())
-        self.network = nn.LabeledNeuralNetwork(
-            FishermanVotingNN.inputs, 
-            FishermanVotingNN.outputs, 
-            FishermanVotingNN.hiddens, 
-            self.edges
-        )
+        self.network = self._network_template(genotype.genome).copy()
+        self._prepared_hearing = None
+
+    # Networks in their initial state by genome, copied for new phenotypes so
+    # that unchanged genomes skip building the network
+    _networks = {}
+    cache_size = 4096
+
+    def _network_template(self, genome):
+        networks = FishermanVotingNN._networks
+        if not genome in networks:
+            if len(networks) >= FishermanVotingNN.cache_size:
+                networks.clear()
+            networks[genome] = nn.LabeledNeuralNetwork(
+                FishermanVotingNN.inputs, 
+                FishermanVotingNN.outputs, 
+                FishermanVotingNN.hiddens, 
+                self.edges
+            )
+        return networks[genome]
         
     def decide_votes(self, agent, coastal_plan, world_map, num_max_complaints):
-        vote_strength = {}
-        for cell in coastal_plan.aquaculture_sites():
-            home = agent.home
-            distance = world_map.get_cell_distance(home, cell) / \
-                world_map.get_max_distance()
-            cond = agent.slot_knowledge[cell] if \
-                cell in agent.slot_knowledge else 0.0
-            values = {
-                "distance":             distance,
-                "home conditions":      agent.slot_knowledge[home],
-                "targeted conditions":  cond
-            }
-            self.network.set_input_values(values)
-            self.network.update()
-            output = self.network.get_output_values()
-            complain = output["vote"] > 0.5
-            if complain:
-                vote_strength[vote.Vote.complaint(cell)] = output["vote"]                
-        
-        return sorted(
-            vote_strength.iterkeys(),
-            key=lambda e: vote_strength[e],
-            reverse=True
-        )[:num_max_complaints]
+        prepared, self._prepared_hearing = self._prepared_hearing, None
+        if prepared is not None and prepared.valid_for(agent, coastal_plan):
+            self.network.values[:] = prepared.state
+            sites, outputs = prepared.sites, prepared.outputs
+        else:
+            sites = coastal_plan.aquaculture_sites()
+            inputs = self.hearing_inputs(agent, sites, world_map)
+            rows = 0 if prepared is None else prepared.reusable_rows(
+                agent, sites, inputs, self.network.values)
+            if rows > 0:
+                self.network.values[:] = prepared.values[rows - 1]
+            outputs = self.network.update_batch(inputs[rows:])
+            if rows > 0:
+                outputs = numpy.vstack((prepared.outputs[:rows], outputs))
+        outputs = outputs[:, self.network.output_labels.index("vote")]
+        return [vote.Vote.complaint(sites[i]) for i in
+            strongest_complaints(outputs, num_max_complaints)]
+
+    @classmethod
+    def prepare_hearing(c, agents, coastal_plan, world_map):
+        """Evaluates the networks of all the agents using this mechanism over
+        all the plan sites at once. Each agent then uses its part of the
+        result in decide_votes, unless its knowledge or home has changed since,
+        for example by learning of earlier agents' complaints. The agent then
+        keeps the rows up to the first site whose inputs changed, and 
+        evaluates its own network from that site on, since the recurrent
+        hidden neurons carry state from site to site.
+
+        Complaints reach the listeners' slot knowledge during the hearing, so
+        many prepared results are stale by the time the agent votes: about 45%
+        with 200 fishermen on a 40x40 map, and about 70% with 60 fishermen.
+        A stale agent has usually heard of many complaint sites, so the first
+        changed site comes early and only a few percent of the rows are 
+        reused. In those runs the hearing is about 1.3 to 1.7 times faster 
+        than evaluating every agent alone, not an order of magnitude.
+        """
+        agents = [a for a in agents if isinstance(a.decision_mechanism, c)]
+        networks = [a.decision_mechanism.network for a in agents]
+        if len(agents) < 2 or not nn.population_compatible(networks):
+            return
+        sites = coastal_plan.aquaculture_sites()
+        inputs = numpy.array([
+            a.decision_mechanism.hearing_inputs(a, sites, world_map)
+                for a in agents
+        ]).reshape(len(agents), len(sites), len(c.inputs))
+        outputs, values = nn.evaluate_population(networks, inputs, True)
+        for i, agent in enumerate(agents):
+            agent.decision_mechanism._prepared_hearing = PreparedHearing(
+                agent, coastal_plan, sites, inputs[i], outputs[i], values[i],
+                networks[i].values.copy()
+            )
+
+    def hearing_inputs(self, agent, sites, world_map):
+        """Builds the network input matrix for a hearing.
+
+        Returns:
+            A NumPy matrix with a row per site, and a column per input, in
+            the order of the network's input_labels.
+        """
+        home = agent.home
+        knowledge = agent.slot_knowledge
+        distances = world_map.get_normalized_distances_from(home)
+        positions = numpy.array(
+            [cell.get_position(world_map) for cell in sites], dtype=int
+        ).reshape(len(sites), 2)
+        columns = {
+            "distance":             distances[positions[:, 0], positions[:, 1]],
+            "home conditions":      knowledge[home],
+            "targeted conditions":  [knowledge.get(cell, 0.0) for cell in sites]
+        }
+        inputs = numpy.empty((len(sites), len(self.network.input_labels)))
+        for i, label in enumerate(self.network.input_labels):
+            inputs[:, i] = columns[label]
+        return inputs
         
     @classmethod
     def new(c, agent, config, world):
@@ -296,6 +502,80 @@ class FishermanVotingNN(decisions.VotingDecisionMechanism, Phenotype):
         )
         
     
+class PreparedHearing(object):
+    """The network outputs for one agent's hearing, evaluated ahead of time.
+
+    Attributes:
+        sites:      The plan's aquaculture sites, in evaluation order
+        inputs:     A NumPy matrix of network inputs, a row per site
+        outputs:    A NumPy matrix of network outputs, a row per site
+        values:     A NumPy matrix of network value vectors, a row per site
+        start:      The network value vector before the first site
+    """
+
+    def __init__(self, agent, coastal_plan, sites, inputs, outputs, values,
+            start):
+        self._agent = agent
+        self._plan = coastal_plan
+        self._plan_version = coastal_plan.version
+        self._home = agent.home
+        self._knowledge_version = agent.slot_knowledge.version
+        self.sites = sites
+        self.inputs = inputs
+        self.outputs = outputs
+        self.values = values
+        self.start = start
+
+    @property
+    def state(self):
+        """The network value vector after the last site."""
+        return self.values[-1] if len(self.values) > 0 else self.start
+
+    def valid_for(self, agent, coastal_plan):
+        return agent is self._agent and coastal_plan is self._plan and \
+            coastal_plan.version == self._plan_version and \
+            agent.home is self._home and \
+            agent.slot_knowledge.version == self._knowledge_version
+
+    def reusable_rows(self, agent, sites, inputs, start):
+        """Counts the leading rows of the prepared result that a hearing of
+        the given sites and inputs, from the start network values, would 
+        compute the same.
+
+        Returns:
+            The number of rows before the first changed site or input row.
+        """
+        if not agent is self._agent or not numpy.array_equal(start, 
+                self.start):
+            return 0
+        rows = 0
+        for a, b in itertools.izip(sites, self.sites):
+            if not a is b:
+                break
+            rows += 1
+        changed = numpy.flatnonzero(
+            (inputs[:rows] != self.inputs[:rows]).any(axis=1))
+        return changed[0] if len(changed) > 0 else rows
+
+def strongest_complaints(outputs, num_max_complaints):
+    """Picks the sites to complain about from the vote outputs of a hearing.
+    Outputs above 0.5 are complaints, and only the num_max_complaints
+    strongest are kept, found by partial selection.
+
+    Returns:
+        A list of site indices, strongest complaint first.
+    """
+    complaints = numpy.flatnonzero(outputs > 0.5)
+    num = len(complaints) if num_max_complaints is None else \
+        min(num_max_complaints, len(complaints))
+    if num == 0:
+        return []
+    if num < len(complaints):
+        complaints = complaints[
+            numpy.argpartition(-outputs[complaints], num - 1)[:num]
+        ]
+    return complaints[numpy.argsort(-outputs[complaints])].tolist()
+    
 class FishermanNNGenotype(Genotype):
     phenotype_class = FishermanVotingNN
     precision = 8  # bits per 1
@@ -311,8 +591,18 @@ class FishermanNNGenotype(Genotype):
         len(phenotype_class.hiddens)
     ) * (weight_range[1] - weight_range[0]) * precision
     
+    # Decoded weights by genome
+    _numbers = {}
+    cache_size = 4096
+    
     def to_number_list(self):
-        def sep(str, acc):
-            if len(str) < self.precision: return acc
-            return sep(str[self.precision:], acc + [str[:self.precision]])
-        return [self.weight_range[0] + int(''.join(e), 2) / 2.0 ** self.precision * (self.weight_range[1] - self.weight_range[0]) for e in sep(self.genome, [])]
\ No newline at end of file
+        numbers = FishermanNNGenotype._numbers
+        if not self.genome in numbers:
+            if len(numbers) >= FishermanNNGenotype.cache_size:
+                numbers.clear()
+            low, high = self.weight_range
+            numbers[self.genome] = tuple((low +
+                self.to_unsigned_array(self.precision) /
+                    2.0 ** self.precision * (high - low)
+            ).tolist())
+        return list(numbers[self.genome])
\ No newline at end of file
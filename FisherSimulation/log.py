@@ -1,4 +1,7 @@
+import os
 import sys
+import Queue
+import threading
 import numpy
 from FisherSimulation import entities
 from time import strftime
@@ -23,6 +26,104 @@ class LogMessage(object):
 class LogEvent(object):
     pass
 
+class LogFile(object):
+    """A buffered output file that is kept open for the lifetime of a logger.
+    
+    Arguments:
+        filename:   The path of the file, which is truncated
+        header:     A line to write first, or None
+        flush:      The flush policy, either "round" to flush at the end of 
+                    every round, or a number of rows to flush after
+    """
+
+    def __init__(self, filename, header=None, flush="round"):
+        assert flush == "round" or int(flush) > 0, \
+            "Invalid flush policy %s" % flush
+        self.filename = filename
+        self._flush = flush if flush == "round" else int(flush)
+        self._rows = 0
+        self._file = open(filename, "w")
+        if not header is None:
+            self._file.write(header)
+
+    def write(self, text):
+        self._file.write(text)
+        self._rows += 1
+        if self._flush != "round" and self._rows >= self._flush:
+            self.flush()
+
+    def end_round(self):
+        if self._flush == "round":
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._rows = 0
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+class AsyncWriter(object):
+    """Runs logging work on a background thread, so that the simulation does
+    not wait for formatting and disk writes.
+    
+    Work is queued as functions with their arguments, and run in order. The 
+    queue is bounded, so submitting waits when the writer falls behind. Work
+    keeps running after an error in the writer thread, and the first error is
+    raised from the next call of submit, flush or close.
+    
+    Arguments:
+        size:   The maximum number of queued functions
+    """
+
+    def __init__(self, size=1024):
+        self._queue = Queue.Queue(size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="log writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                function, args = item
+                function(*args)
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if not self._error is None:
+            error, self._error = self._error, None
+            raise error
+
+    def submit(self, function, *args):
+        self._raise_error()
+        assert self._thread.is_alive(), "The writer has been closed."
+        self._queue.put((function, args))
+
+    def flush(self):
+        """Waits until all submitted work has been done."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Does all submitted work, and stops the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
 class RoundStatistics(LogEvent):
     filename = "round_statistics.csv"
 
@@ -65,30 +166,283 @@ class VoteFitnessRelation(LogEvent):
     def add_fitness(self, fitness):
         self.fitness = fitness
 
+class GrowableArray(object):
+    """A one-dimensional NumPy array that is appended to. Its capacity is
+    preallocated, and doubled whenever it runs out."""
+
+    def __init__(self, dtype, capacity=64):
+        self._array = numpy.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def append(self, value):
+        if self._size == len(self._array):
+            self._array = numpy.resize(self._array, 2 * len(self._array))
+        self._array[self._size] = value
+        self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def data(self):
+        return self._array[:self._size]
+
+class ArchiveTable(object):
+    """Columns of equal length, stored as GrowableArrays. Rows may add new 
+    float columns, which are filled with NaN for earlier rows, and values 
+    missing from a row are NaN for float columns and 0 for others.
+    
+    Arguments:
+        name:       The name of the table
+        columns:    A list of (column name, NumPy dtype) tuples
+    """
+
+    def __init__(self, name, columns=()):
+        self.name = name
+        self.columns = []
+        self._arrays = {}
+        self._size = 0
+        for column, dtype in columns:
+            self.add_column(column, dtype)
+
+    def add_column(self, column, dtype=float):
+        array = GrowableArray(dtype)
+        for __ in xrange(self._size):
+            array.append(ArchiveTable.missing(array))
+        self.columns.append(column)
+        self._arrays[column] = array
+
+    def append(self, row):
+        for column in row:
+            if not column in self._arrays:
+                self.add_column(column)
+        for column in self.columns:
+            array = self._arrays[column]
+            value = row.get(column)
+            array.append(ArchiveTable.missing(array) if value is None 
+                else value)
+        self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, column):
+        return self._arrays[column].data
+
+    @staticmethod
+    def missing(array):
+        return numpy.nan if array.data.dtype.kind == "f" else 0
+
+class RunArchive(object):
+    """A columnar binary archive of a run, with the same records as the CSV
+    logs: the phase statistics of each round, the round statistics, and the
+    vote fitness relation of each agent in each round.
+    
+    Every column of a table is saved as its own .npy file, listed with the
+    table and column names in index.csv, so that analysis can load single 
+    columns with numpy.load(filename, mmap_mode='r'), or all of them with 
+    RunArchive.load. Agents are stored as numbers, indexing agent_ids.npy.
+    
+    The archive is saved when the logger is closed, and every save_rounds
+    rounds if given, so that a run that doesn't finish keeps the rounds up 
+    to the last save. Each save writes the whole tables again.
+    
+    Arguments:
+        directory:      The directory to save the archive in, created if 
+                        needed
+        save_rounds:    The number of rounds between saves, or None to save
+                        only on close
+    """
+
+    INDEX_FILENAME = "index.csv"
+    AGENT_IDS_FILENAME = "agent_ids.npy"
+
+    def __init__(self, directory="archive", save_rounds=None):
+        self.directory = directory
+        self._save_rounds = save_rounds
+        self._rounds = 0
+        self.statistics = ArchiveTable("statistics", [("round", int)])
+        self.rounds = ArchiveTable("rounds", [
+            (label, int if format == "d" else float) 
+                for label, format in RoundStatistics.attrs_format
+        ])
+        self.agents = ArchiveTable("agents", [
+            ("round", int),
+            ("agent", int),
+            ("num_complaints", int),
+            ("fitness", float)
+        ])
+        self._agent_ids = []
+        self._agent_numbers = {}
+
+    def add_statistics(self, round, statistics):
+        row = dict(statistics)
+        row["round"] = round
+        self.statistics.append(row)
+
+    def add_round_statistics(self, statistics):
+        self.rounds.append({label: getattr(statistics, label) 
+            for label, __ in RoundStatistics.attrs_format})
+
+    def add_vote_fitness_relation(self, round, agent_id, num_complaints,
+            fitness):
+        if not agent_id in self._agent_numbers:
+            self._agent_numbers[agent_id] = len(self._agent_ids)
+            self._agent_ids.append(agent_id)
+        self.agents.append({
+            "round":            round,
+            "agent":            self._agent_numbers[agent_id],
+            "num_complaints":   num_complaints,
+            "fitness":          fitness
+        })
+
+    def end_round(self):
+        """Saves the archive if save_rounds rounds have passed since the last
+        save."""
+        self._rounds += 1
+        if self._save_rounds and self._rounds % self._save_rounds == 0:
+            self.save()
+
+    def save(self):
+        """Writes all tables to the archive directory, replacing earlier 
+        saves."""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        index = ["table,column,filename\n"]
+        for table in (self.statistics, self.rounds, self.agents):
+            for i, column in enumerate(table.columns):
+                filename = "%s.%d.npy" % (table.name, i)
+                numpy.save(os.path.join(self.directory, filename), 
+                    table[column])
+                index.append("%s,%s,%s\n" % 
+                    (table.name, column.replace(",", ""), filename))
+        numpy.save(os.path.join(self.directory, 
+            RunArchive.AGENT_IDS_FILENAME), numpy.array(self._agent_ids, 
+                dtype=str))
+        with open(os.path.join(self.directory, 
+                RunArchive.INDEX_FILENAME), "w") as file:
+            file.writelines(index)
+
+    @staticmethod
+    def load(directory, mmap_mode="r"):
+        """Loads a saved archive.
+        
+        Returns:
+            A dict of tables by name, each a dict of column arrays by column
+            name, and the agent id array by "agent ids".
+        """
+        tables = {}
+        with open(os.path.join(directory, RunArchive.INDEX_FILENAME)) as file:
+            for line in file.readlines()[1:]:
+                table, column, filename = line.rstrip("\n").split(",")
+                tables.setdefault(table, {})[column] = numpy.load(
+                    os.path.join(directory, filename), mmap_mode=mmap_mode)
+        tables["agent ids"] = numpy.load(os.path.join(directory, 
+            RunArchive.AGENT_IDS_FILENAME), mmap_mode=mmap_mode)
+        return tables
+
 class StatisticsLogger(object):
+    """Logs the phase statistics of each round.
+    
+    Rounds are appended to a long format file, with a (round, key, value) row
+    per statistic, so new keys never cause earlier rounds to be rewritten. The
+    wide format file, with a row per round and a column per key, is written
+    on close, or on demand with write_wide. The files are written in the 
+    given directory, created if needed, or the working directory.
+    """
+
     FILENAME = "statistics.csv"
+    LONG_FILENAME = "statistics_long.csv"
 
-    def __init__(self):
+    def __init__(self, flush="round", archive=None, writer=None, 
+            directory=""):
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self._archive = archive
+        self._writer = writer
         self._statistics = {}    # round to data, data is {fieldname: value}
         self._fields = ["round"]
-        self._written_fields = ["round"]
+        self._written_rounds = []
+        self._statistics_file = LogFile(
+            self.path(StatisticsLogger.LONG_FILENAME), 
+            "round,key,value\n", flush)
 
     def write_round(self, round):
-        if len(self._written_fields) < len(self._fields):
-            # If we discover a new field that has never been written before,
-            # delete the old file and add a new header line with all the fields
-            with open(StatisticsLogger.FILENAME, "w") as file:
-                file.write(StatisticsLogger.to_headers_line(self._fields))
-            self._written_fields = self._fields
-            for r in self._statistics:
-                self.write_round(r)
+        self._written_rounds.append(round)
+        self._submit(self._write_round, round, 
+            dict(self._statistics.get(round, {})), self._fields[1:])
+
+    def _write_round(self, round, statistics, keys):
+        if not self._archive is None:
+            self._archive.add_statistics(round, statistics)
+        for key in keys:
+            if key in statistics:
+                self._statistics_file.write(StatisticsLogger.to_long_line(
+                    round, key, statistics[key]))
+
+    def path(self, filename):
+        """Returns the path of a file in the logger's directory."""
+        return os.path.join(self.directory, filename)
+
+    def _submit(self, function, *args):
+        """Writes now, or on the writer thread if the logger has one."""
+        if self._writer is None:
+            function(*args)
         else:
-            line = StatisticsLogger.to_columns(
-                self._statistics[round],
-                self._fields
-            )
-            with open(StatisticsLogger.FILENAME, "a") as file:
-                file.write(line)
+            self._writer.submit(function, *args)
+
+    def get_last_round_statistics(self):
+        """Returns a copy of the statistics of the last written round, or an
+        empty dict if no round has been written."""
+        if not self._written_rounds:
+            return {}
+        return dict(self._statistics.get(self._written_rounds[-1], {}))
+
+    def write_wide(self, filename=None):
+        """Writes the statistics of all written rounds in the wide format.
+        
+        Arguments:
+            filename:   The path to write to, statistics.csv in the logger's
+                        directory by default
+        """
+        with open(filename or self.path(StatisticsLogger.FILENAME), 
+                "w") as file:
+            file.write(StatisticsLogger.to_headers_line(self._fields))
+            for round in self._written_rounds:
+                file.write(StatisticsLogger.to_columns(
+                    self._statistics.get(round, {"round": round}), 
+                    self._fields
+                ))
+
+    def end_round(self):
+        """Flushes the files with the "round" flush policy, and saves the 
+        archive when it's due."""
+        self._submit(self._statistics_file.end_round)
+        if not self._archive is None:
+            self._submit(self._archive.end_round)
+
+    def close(self):
+        """Does the work left on the writer, if any, and closes the files. The
+        files are closed even if the writer raises an error."""
+        try:
+            if not self._writer is None:
+                self._writer.close()
+        finally:
+            self._close_files()
+
+    def _close_files(self):
+        if not self._statistics_file.closed:
+            self._statistics_file.close()
+            self.write_wide()
+            if not self._archive is None:
+                self._archive.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
 
     def add_phase_statistics(self, round, data):
         for key in data:
@@ -110,6 +464,11 @@ class StatisticsLogger(object):
     def to_headers_line(cls, fields):
         return ",".join(f.replace(",", "") for f in fields) + "\n"
 
+    @classmethod
+    def to_long_line(cls, round, key, value):
+        return "%d,%s,%s\n" % (round, key.replace(",", ""), 
+            "%.10f" % value if value is not None else "")
+
     @classmethod
     def to_columns(cls, statistics, keys):
         def f(e): return "%.10f" % e if e is not None else ""
@@ -117,17 +476,33 @@ class StatisticsLogger(object):
 
 
 class Logger(StatisticsLogger):
-    def __init__(self, filename):
-        StatisticsLogger.__init__(self)
+    """Writes the statistics, round statistics and vote fitness relations of 
+    a simulation. The files are kept open until close() is called, which the
+    logger does when used as a context manager.
+    
+    Arguments:
+        filename:   The path of the text log
+        flush:      The flush policy of the files, see LogFile
+        archive:    A RunArchive to also record the statistics in, or None
+        writer:     An AsyncWriter to write on, or None to write in the 
+                    calling thread
+        directory:  The directory to write all files in, or "" for the 
+                    working directory
+    """
+
+    def __init__(self, filename, flush="round", archive=None, writer=None,
+            directory=""):
+        StatisticsLogger.__init__(self, flush, archive, writer, directory)
         self.filename = filename
         self.vote_fitness_relations = {}
-        with open(vote_fitness_relation_filename, "w") as file:
-            file.write("round,agent,num_complaints,fitness\n")
-        with open(RoundStatistics.filename, "w") as file:
-            file.write(RoundStatistics.headers())
+        self._vfr_file = LogFile(self.path(vote_fitness_relation_filename), 
+            "round,agent,num_complaints,fitness\n", flush)
+        self._round_statistics_file = LogFile(
+            self.path(RoundStatistics.filename), RoundStatistics.headers(), 
+            flush)
 
     def log(self, message):
-        with open(filename, "a") as file:
+        with open(self.path(self.filename), "a") as file:
             file.write("%s\n" % str(message) + "\n")
 
     def write_round_statistics(self, round, world, aquacultures):
@@ -147,23 +522,34 @@ class Logger(StatisticsLogger):
                             "num_complaints", None) is not None and
                         a.__class__ == entities.Fisherman])
             },
-            len([c for c in world.get_all_cells() if not c.is_blocked()]),
+            world.get_num_unblocked_cells(),
             len(aquacultures)
         )
-        with open(RoundStatistics.filename, "a") as file:
-            file.write(statistics.to_csv_line())
+        self._submit(self._write_round_statistics, statistics)
+
+    def _write_round_statistics(self, statistics):
+        self._round_statistics_file.write(statistics.to_csv_line())
+        if not self._archive is None:
+            self._archive.add_round_statistics(statistics)
 
     def save_vote_fitness_relation(self, round, agent):
-        line = "%(round)d,%(agent)s,%(num_complaints)d,%(fitness)f\n"
         rel = self.vote_fitness_relations[round][agent]
+        self._submit(self._write_vote_fitness_relation, round, 
+            agent.get_id(), rel.num_complaints, rel.fitness)
+
+    def _write_vote_fitness_relation(self, round, agent_id, num_complaints,
+            fitness):
+        line = "%(round)d,%(agent)s,%(num_complaints)d,%(fitness)f\n"
         text = line % {
             "round":            round,
-            "agent":            agent.get_id(),
-            "num_complaints":   rel.num_complaints,
-            "fitness":          rel.fitness
+            "agent":            agent_id,
+            "num_complaints":   num_complaints,
+            "fitness":          fitness
         }
-        with open(vote_fitness_relation_filename, "a") as file:
-            file.write(text)
+        self._vfr_file.write(text)
+        if not self._archive is None:
+            self._archive.add_vote_fitness_relation(round, agent_id,
+                num_complaints, fitness)
 
     def add_fitness(self, round, agent, fitness):
         if agent in self.vote_fitness_relations[round]:
@@ -181,6 +567,16 @@ class Logger(StatisticsLogger):
             self.vote_fitness_relations[round] = {}
         self.vote_fitness_relations[round][agent] = VoteFitnessRelation(agent)
 
+    def end_round(self):
+        self._submit(self._vfr_file.end_round)
+        self._submit(self._round_statistics_file.end_round)
+        StatisticsLogger.end_round(self)
+
+    def _close_files(self):
+        self._vfr_file.close()
+        self._round_statistics_file.close()
+        StatisticsLogger._close_files(self)
+
     @classmethod
-    def new(c):
-        return c(default_filename)
\ No newline at end of file
+    def new(c, flush="round", archive=None, writer=None, directory=""):
+        return c(default_filename, flush, archive, writer, directory)
\ No newline at end of file
@@ -16,12 +16,39 @@ def convert_edge_tuples(edges, label_to_neuron, neurons):
         out[neuron_a][neuron_b] = value
     return out
 
+def update_stages(order, weights):
+    """Splits the neuron update order into stages that can each be updated
+    with a single matrix-vector product.
+
+    Neurons are updated one at a time in the given order, so a neuron sees the
+    new value of any neuron updated before it. A stage therefore ends before
+    the first neuron that has an incoming edge from another neuron in the
+    stage.
+
+    Arguments:
+        order:      A list of neuron indices in update order
+        weights:    A NumPy matrix where [i, j] is the weight from i to j
+
+    Returns:
+        A list of lists of neuron indices.
+    """
+    stages = []
+    for j in order:
+        if not stages or any(weights[i, j] != 0.0 for i in stages[-1]):
+            stages.append([])
+        stages[-1].append(j)
+    return stages
+
 class LabeledNeuralNetwork(object):
     """
     This class implements the neural network itself. It takes parameters for a 
     list of neurons in each layer (one input, one hidden and one output), and 
     contains methods for updating the input, processing and retrieving the 
     output.
+
+    The network is compiled into a weight matrix and a value vector when it is
+    created, and the neurons are views into the value vector, so the labeled
+    API and the vector API (set_input_vector, get_output_vector) can be mixed.
     """
 
     # Connectivity: (a, b, val)
@@ -36,10 +63,81 @@ class LabeledNeuralNetwork(object):
         self.hiddens["bias"] = Neuron(-1.0, Neuron.HIDDEN) # add bias node
         connectivity_valid, err = self.validate_edges(edges)
         assert connectivity_valid, "Invalid edges. " + err
-        self.edges = convert_edge_tuples(edges, {
+        self._edges = convert_edge_tuples(edges, {
             label: neuron for (label, neuron) 
                           in zip(self.labels(), self.neurons())
         }, self.neurons())
+        self._compile()
+
+    def _compile(self):
+        neurons = self.neurons()
+        index = {n: i for i, n in enumerate(neurons)}
+        self.weights = numpy.array(
+            [[self.edges[m][n] for n in neurons] for m in neurons]
+        )
+        self.values = numpy.array([n.value for n in neurons])
+        for n in neurons:
+            n.bind(self.values, index[n])
+        self.input_labels = self.inputs.keys()
+        self.output_labels = self.outputs.keys()
+        self._input_indices = numpy.array(
+            [index[self.inputs[l]] for l in self.input_labels])
+        self._output_indices = numpy.array(
+            [index[self.outputs[l]] for l in self.output_labels])
+        stages = update_stages(
+            [index[n] for n in self.hiddens.values() + self.outputs.values()],
+            self.weights
+        )
+        self._stages = [
+            (numpy.array(stage), self.weights[:, stage].T.copy())
+                for stage in stages
+        ]
+        # A batch can be evaluated stage by stage if no stage reads a neuron
+        # of a later stage. Stages that read their own neurons carry state
+        # from row to row and are evaluated row by row.
+        self._batchable = not any(
+            self.weights[numpy.ix_(later, stage)].any() for stage, later in
+                zip(stages, [sum(stages[i + 1:], []) for i in
+                    xrange(len(stages))]) if later
+        )
+        self._batch_stages = []
+        for stage, weights in self._stages:
+            carried = weights[:, stage]
+            fixed = weights.copy()
+            fixed[:, stage] = 0.0
+            self._batch_stages.append(
+                (stage, weights, fixed, carried if carried.any() else None)
+            )
+        # Copies share the compiled weights, so they must not be changed
+        for array in [self.weights] + [array for batch_stage in 
+                self._batch_stages for array in batch_stage[1:]]:
+            if not array is None:
+                array.flags.writeable = False
+        
+    def copy(self):
+        """Returns a network with the same labels and weights, and a copy of
+        the current neuron values. The compiled weights are shared."""
+        other = object.__new__(self.__class__)
+        other.__dict__.update(self.__dict__)
+        other.values = self.values.copy()
+        for layer in ("inputs", "hiddens", "outputs"):
+            copies = {}
+            for label, n in getattr(self, layer).iteritems():
+                copies[label] = Neuron(0.0, n.type)
+                copies[label].bind(other.values, n._index)
+            setattr(other, layer, copies)
+        other._edges = None
+        return other
+
+    @property
+    def edges(self):
+        """The weights as a dict of dicts of neurons, edges[from][to]. Copies
+        of a network build it from the weight matrix when first needed."""
+        if self._edges is None:
+            neurons = sorted(self.neurons(), key=lambda n: n._index)
+            self._edges = {a: {b: float(self.weights[a._index, b._index])
+                for b in neurons} for a in neurons}
+        return self._edges
         
     def labels(self):
         return [e for l in [self.inputs, self.hiddens, self.outputs] 
@@ -73,15 +171,120 @@ class LabeledNeuralNetwork(object):
         
     def get_output(self, label):
         return self.outputs[label].value
+
+    def set_input_vector(self, values):
+        """Sets the input values in the order of input_labels."""
+        self.values[self._input_indices] = values
+
+    def get_output_vector(self):
+        """Gives the output values in the order of output_labels."""
+        return self.values[self._output_indices]
         
     def update(self):
-        for n in self.hiddens.values() + self.outputs.values():
+        for stage, weights in self._stages:
             # sigmoid
-            n.value = 1/(1 + numpy.exp(
-                -sum([m.value * self.edges[m][n] for m in self.neurons()])
-            ))
+            self.values[stage] = 1/(1 + numpy.exp(-weights.dot(self.values)))
+
+    def update_batch(self, inputs):
+        """Runs one update for each row of input values, with the same result
+        as calling set_input_vector and update for each row in turn. The
+        network is left in the state after the last row.
+
+        Arguments:
+            inputs: A NumPy matrix with a row of input values per update, in
+                    the order of input_labels.
+
+        Returns:
+            A NumPy matrix with a row of output values per update, in the
+            order of output_labels.
+        """
+        inputs = numpy.asarray(inputs, dtype=numpy.float64)
+        rows = len(inputs)
+        if rows == 0:
+            return numpy.empty((0, len(self._output_indices)))
+        if not self._batchable:
+            outputs = numpy.empty((rows, len(self._output_indices)))
+            for row in xrange(rows):
+                self.set_input_vector(inputs[row])
+                self.update()
+                outputs[row] = self.get_output_vector()
+            return outputs
+        values = numpy.tile(self.values, (rows, 1))
+        values[:, self._input_indices] = inputs
+        for stage, weights, fixed, carried in self._batch_stages:
+            if carried is None:
+                values[:, stage] = 1/(1 + numpy.exp(-values.dot(weights.T)))
+            else:
+                fixed_sums = values.dot(fixed.T)
+                state = self.values[stage]
+                for row in xrange(rows):
+                    state = 1/(1 + numpy.exp(
+                        -(fixed_sums[row] + carried.dot(state))
+                    ))
+                    values[row, stage] = state
+        self.values[:] = values[-1]
+        return values[:, self._output_indices]
         
         
+def population_compatible(networks):
+    """Checks that networks have the same layout and update stages, so that
+    they can be evaluated together by evaluate_population."""
+    first = networks[0]
+    layout = lambda n: (
+        n.values.shape,
+        n._batchable,
+        n._input_indices.tolist(),
+        n._output_indices.tolist(),
+        [stage.tolist() for stage, __ in n._stages]
+    )
+    return first._batchable and \
+        all(layout(n) == layout(first) for n in networks[1:])
+
+def evaluate_population(networks, inputs, all_rows=False):
+    """Runs update_batch for several networks at once, with their weights
+    stacked into 3-dimensional arrays. The networks are left untouched.
+
+    Arguments:
+        networks:   A list of LabeledNeuralNetwork instances, accepted by
+                    population_compatible.
+        inputs:     A NumPy array of shape (networks, rows, inputs).
+        all_rows:   Whether to return the value vectors after every row
+                    instead of only after the last row.
+
+    Returns:
+        A duple of NumPy arrays: the outputs, of shape (networks, rows,
+        outputs), and the value vector of each network after the last row, of
+        shape (networks, neurons), or after every row, of shape (networks, 
+        rows, neurons).
+    """
+    first = networks[0]
+    inputs = numpy.asarray(inputs, dtype=numpy.float64)
+    rows = inputs.shape[1]
+    start = numpy.array([n.values for n in networks])
+    if rows == 0:
+        return numpy.empty((len(networks), 0, len(first._output_indices))), \
+            numpy.empty((len(networks), 0, start.shape[1])) if all_rows else start
+    values = numpy.repeat(start[:, numpy.newaxis, :], rows, axis=1)
+    values[:, :, first._input_indices] = inputs
+    for i, (stage, __, ___, ____) in enumerate(first._batch_stages):
+        weights = numpy.array([n._batch_stages[i][1] for n in networks])
+        carried = [n._batch_stages[i][3] for n in networks]
+        if all(c is None for c in carried):
+            values[:, :, stage] = 1/(1 + numpy.exp(
+                -numpy.einsum("frn,fkn->frk", values, weights)
+            ))
+        else:
+            fixed = numpy.array([n._batch_stages[i][2] for n in networks])
+            carried = weights[:, :, stage]
+            fixed_sums = numpy.einsum("frn,fkn->frk", values, fixed)
+            state = start[:, stage]
+            for row in xrange(rows):
+                state = 1/(1 + numpy.exp(-(fixed_sums[:, row] +
+                    numpy.einsum("fkj,fj->fk", carried, state))))
+                values[:, row, stage] = state
+    return values[:, :, first._output_indices], \
+        values if all_rows else values[:, -1]
+
 class Neuron(object):
     """
     Neurons are implemented through this class which stores the value and type 
@@ -93,5 +296,19 @@ class Neuron(object):
     OUTPUT = 2
 
     def __init__(self, v, type):
-        self.value = v
-        self.type = type
\ No newline at end of file
+        self._values = [v]
+        self._index = 0
+        self.type = type
+
+    def bind(self, values, index):
+        """Stores the value of this neuron at the given index of a vector."""
+        self._values = values
+        self._index = index
+
+    @property
+    def value(self):
+        return float(self._values[self._index])
+
+    @value.setter
+    def value(self, v):
+        self._values[self._index] = v
\ No newline at end of file
@@ -61,6 +61,7 @@ class Round(object):
             self.info.directory.get_agents(type = entities.Aquaculture)
         )
         self.info.logger.write_round(self._round_counter)
+        self.info.logger.end_round()
         self._step_counter = 0
         self._round_counter += 1
         self._current_step = self._start
@@ -164,8 +165,14 @@ class Hearing(Step):
     def do(self, round, step):
         data = {"statistics": {}}
         self.info.directory.get_government().new_vote_round()
+        voting_agents = self.info.directory.get_voting_agents()
+        coastal_plan = self.info.directory.get_municipality().get_plan()
+        for mechanism in set(a.decision_mechanism.__class__ for a in
+                voting_agents):
+            mechanism.prepare_hearing(voting_agents, coastal_plan, 
+                self.info.map)
         votes = {}
-        for agent in self.info.directory.get_voting_agents():
+        for agent in voting_agents:
             votes[agent] = agent.hearing(
                 self.info.map
             )
@@ -266,9 +273,8 @@ class Building(Step):
                     location
                 ))
                 
-        cells = self.info.map.get_all_cells()
         data["statistics"]["total fish quantity"] = {
-            "value": float(sum(cell.get_fish_quantity() for cell in cells))
+            "value": self.info.map.get_total_fish_quantity()
         }
         data["statistics"]["number of aquacultures"] = {
             "value": float(len(
@@ -277,7 +283,7 @@ class Building(Step):
         }
         data["statistics"]["unblocked cells"] = {
             "plot": False,
-            "value": float(sum(1 for e in cells if not e.is_blocked()))
+            "value": float(self.info.map.get_num_unblocked_cells())
         }
         return StepResult.cells_changed(self, affected_cells, self.info.map, 
             data, round)
@@ -297,14 +303,13 @@ class Learning(Step):
         market = self.info.market
         world_map = self.info.map
         aquaculture_agents = dir.get_agents(type = entities.Aquaculture)
-        fitnesses = {
-            agent: agent.get_priorities_satisfaction(
-                priority.Influences(
-                    agent, all_agents, market, community_members, fishermen, 
-                    world_map, aquaculture_agents
-                )
-            ) for agent in self.info.directory.get_agents()
-        }
+        influences = priority.SharedInfluences(
+            None, all_agents, market, community_members, fishermen, 
+            world_map, aquaculture_agents
+        )   # agent-independent priority values are calculated once
+        fitnesses = priority.priorities_satisfaction(
+            self.info.directory.get_agents(), influences
+        )
         
         # record average fitness
         for t, l in [(entities.Fisherman, "fisherman")]:
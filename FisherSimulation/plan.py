@@ -3,24 +3,112 @@ The plan module contains classes that simplify dealing with the coastal
 plan.
 """
 
+import util
+
 class CoastalPlan(dict):
     """
     This class subclasses the standard Python dictionary, and is used to map 
     cells to plan entities.
+    
+    The cells of each entity are kept in sets that are updated when cells are
+    set or deleted, so the cells of an entity can be listed without scanning 
+    the plan. Cells that have been found blocked are removed lazily from the
+    sets used for random_unblocked, since cells are never unblocked.
     """
     
     def __init__(self, dictionary):
+        dict.__init__(self)
+        self.version = 0    # incremented on every change
+        self._cells = {}    # entity to set of cells
+        self._lists = {}    # entity to list of cells, until the next change
+        self._unblocked = {}    # entity to util.IndexedSet of cells
         for key in dictionary:
-            dict.__setitem__(self, key, dictionary[key])
+            self[key] = dictionary[key]
+            
+    def __setitem__(self, cell, entity):
+        if cell in self:
+            self._remove(cell)
+        dict.__setitem__(self, cell, entity)
+        self._cells.setdefault(entity, set()).add(cell)
+        self._lists.pop(entity, None)
+        if entity in self._unblocked:
+            self._unblocked[entity].add(cell)
+        self.version += 1
+        
+    def __delitem__(self, cell):
+        self._remove(cell)
+        dict.__delitem__(self, cell)
+        self.version += 1
+
+    # The other mutating dict methods would bypass the entity sets
+
+    def update(self, *args, **kwargs):
+        for cell, entity in dict(*args, **kwargs).iteritems():
+            self[cell] = entity
+
+    def setdefault(self, cell, entity=None):
+        if not cell in self:
+            self[cell] = entity
+        return self[cell]
+
+    def pop(self, cell, *default):
+        if not cell in self:
+            return dict.pop(self, cell, *default)
+        entity = self[cell]
+        del self[cell]
+        return entity
+
+    def popitem(self):
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        cell = next(iter(self))
+        return cell, self.pop(cell)
+
+    def clear(self):
+        dict.clear(self)
+        self._cells = {}
+        self._lists = {}
+        self._unblocked = {}
+        self.version += 1
+        
+    def _remove(self, cell):
+        entity = self[cell]
+        self._cells[entity].discard(cell)
+        self._lists.pop(entity, None)
+        if entity in self._unblocked:
+            self._unblocked[entity].discard(cell)
             
     def _of_type(self, type):
-        return [cell for cell in self if self[cell] == type]
+        """Returns a list of the cells of the entity. The list is shared until
+        the plan changes, and should not be modified."""
+        if not type in self._lists:
+            self._lists[type] = list(self._cells.get(type, ()))
+        return self._lists[type]
             
     def aquaculture_sites(self):
         return self._of_type(AQUACULTURE_SITE)
         
     def reserved_zones(self):
         return self._of_type(RESERVED_ZONE)
+        
+    def random_unblocked(self, type):
+        """Draws a random cell of the entity that is not blocked. Blocked 
+        cells that are drawn are not considered again, so drawing is constant
+        time amortized over the life of the plan.
+        
+        Returns:
+            A world.Slot instance, or None if all cells of the entity are 
+            blocked.
+        """
+        if not type in self._unblocked:
+            self._unblocked[type] = util.IndexedSet(self._cells.get(type, ()))
+        cells = self._unblocked[type]
+        while len(cells) > 0:
+            cell = cells.choice()
+            if not cell.is_blocked():
+                return cell
+            cells.discard(cell)
+        return None
     
 class PlanEntity(object):
     """
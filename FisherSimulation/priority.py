@@ -39,6 +39,79 @@ class Influences(object):
             self.world_map,
             self.aquaculture_agents
         )
+        
+    def value_of(self, priority):
+        return priority.calculate_value(self)
+
+class SharedInfluences(Influences):
+    """
+    Influences for evaluating many agents in the same phase. Values of 
+    priorities that do not depend on the agent are calculated once and shared
+    by all copies made with copy_for, so the influences must not change while
+    the copies are in use.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        Influences.__init__(self, *args, **kwargs)
+        self._values = {}
+        
+    def copy_for(self, agent):
+        influences = SharedInfluences(
+            agent,
+            self.all_agents,
+            self.market,
+            self.community_members,
+            self.fishermen,
+            self.world_map,
+            self.aquaculture_agents
+        )
+        influences._values = self._values
+        return influences
+        
+    def value_of(self, priority):
+        if priority.agent_specific:
+            return priority.calculate_value(self)
+        if not priority in self._values:
+            self._values[priority] = priority.calculate_value(self)
+        return self._values[priority]
+
+def priorities_satisfaction(agents, influences):
+    """Calculates the weighted average of priority values for many agents at 
+    once, as PrioritizingAgent.get_priorities_satisfaction does for one.
+    
+    The weights of all agents form an (agents x priorities) matrix. Values of 
+    agent-independent priorities are calculated once, and agent-specific 
+    values only for the agents that have the priority.
+    
+    Arguments:
+        agents:     A list of prioritizing agents
+        influences: Influences shared by all agents, usually SharedInfluences
+        
+    Returns:
+        A dict of satisfactions by agent
+    """
+    priorities = []
+    for a in agents:
+        priorities += [p for p in a.get_priorities() if not p in priorities]
+    shared = [p for p in priorities if not p.agent_specific]
+    specific = [p for p in priorities if p.agent_specific]
+    weights = numpy.array([
+        [a.get_priorities().get(p, 0.0) for p in shared + specific] 
+            for a in agents
+    ], dtype=float).reshape(len(agents), len(priorities))
+    values = numpy.array([influences.value_of(p) for p in shared], 
+        dtype=float)
+    s = weights[:, :len(shared)].dot(values)
+    if specific:
+        specific_values = numpy.array([
+            [influences.copy_for(a).value_of(p) if p in a.get_priorities() 
+                else 0.0 for p in specific] for a in agents
+        ], dtype=float)
+        s += (weights[:, len(shared):] * specific_values).sum(axis=1)
+    t = weights.sum(axis=1)
+    satisfaction = numpy.ones(len(agents))
+    numpy.divide(s, t, out=satisfaction, where=t != 0.0)
+    return dict(zip(agents, satisfaction.tolist()))
 
 class Priority(object):
     """
@@ -47,10 +120,12 @@ class Priority(object):
     """
 
     # <dobule> calculate_value(...) should be implemented for all instances
+    # agent_specific should be set if the value depends on influences.agent
     
-    def __init__(self, name, calculate_value):
+    def __init__(self, name, calculate_value, agent_specific = False):
         self.name = name
         self.calculate_value = calculate_value
+        self.agent_specific = agent_specific
         
 def OwnProfits_value(influences):
     return influences.agent.capital
@@ -71,22 +146,22 @@ def FishingIndustryExisting_value(influences):
         )/len(influences.fishermen)
         
 def NaturalFishHealth_value(influences):
-    slots = influences.world_map.get_all_cells()
-    return sum([s.get_fish_quantity() for s in slots])/len(slots)
+    world_map = influences.world_map
+    return world_map.get_total_fish_quantity() / world_map.get_num_cells()
     
 def AquacultureIndustryExisting_value(influences):
     return 1.0 if len(influences.aquaculture_agents) > 0 else 0.0
     
-def NonintrusiveAquaculture_value(infleucnes):
+def NonintrusiveAquaculture_value(influences):
     slots = influences.agent.get_priority_slots()
     return sum([0 if s.has_aquaculture() else 1 for s in slots])/len(slots)
 
 # Exported real priorities
-OwnProfits = Priority("Own Profits", OwnProfits_value)
+OwnProfits = Priority("Own Profits", OwnProfits_value, True)
 WildFishPrice = Priority("Wild Fish Price", WildFishPrice_value)
 SalmonPrice = Priority("Salmon Price", SalmonPrice_value)
 CommunityWealth = Priority("Community Wealth", CommunityWealth_value)
 FishingIndustryExisting = Priority("Fishing Industry Existing", FishingIndustryExisting_value)
 NaturalFishHealth = Priority("Natural Fish Health", NaturalFishHealth_value)
 AquacultureIndustryExisting = Priority("Aquaculture Industry Existing", AquacultureIndustryExisting_value)
-NonintrusiveAquaculture = Priority("Nonintrusive Aquaculture", NonintrusiveAquaculture_value)
\ No newline at end of file
+NonintrusiveAquaculture = Priority("Nonintrusive Aquaculture", NonintrusiveAquaculture_value, True)
\ No newline at end of file
@@ -1,5 +1,6 @@
 """Module for initializing and running the simulation."""
 
+import os
 from collections import namedtuple
 
 from config import config
@@ -18,23 +19,37 @@ class Simulation(object):
     def __init__(self):
         self._cfg = None
         self._round = None
+        self.output_directory = None
 
-    def setup_config(self, filename=None):
+    def setup_config(self, filename=None, overrides=None):
         """Loads the configuration and makes sure it is processed.
 
         Arguments:
             filename    The relative path (from project directory) of a
                         configuration file.
+            overrides   A dict of values to set in the configuration, by
+                        dot separated key paths like 
+                        "government.complaint approval probability".
         """
         if not filename is None:
-            cfg = config.load(varargs=None, filename=filename)
+            cfg = config.load(varargs=None, filename=filename,
+                overrides=overrides)
         else:
-            cfg = config.load(varargs=None)
+            cfg = config.load(varargs=None, overrides=overrides)
         self._cfg = cfg
 
-    def initialize(self):
+    def initialize(self, output_directory=None, run_id=None):
         """Initializes the map and entities in the simulation.
 
+        Arguments:
+            output_directory    The directory to write the logs in. Defaults
+                                to the "output directory" global, or the
+                                working directory.
+            run_id              If given, the logs are written in a 
+                                subdirectory of this name in the output 
+                                directory, so that runs do not overwrite 
+                                each other's logs.
+
         Returns:
             A SimulationInfo instance from the do module, describing the
             simulation properties.
@@ -42,10 +57,30 @@ class Simulation(object):
 
         assert not self._cfg is None, \
             "Configuration not initiated. Run setup_config()"
+        self.close()
+
+        if output_directory is None:
+            output_directory = self._cfg["global"].get("output directory")
+        output_directory = output_directory or ""
+        if not run_id is None:
+            output_directory = os.path.join(output_directory, str(run_id))
+        self.output_directory = output_directory
+
+        logger = log.Logger.new(
+            self._cfg["global"].get("log flush", "round"),
+            log.RunArchive(os.path.join(output_directory, "archive"),
+                self._cfg["global"].get("archive save rounds"))
+                if self._cfg["global"].get("run archive", False) else None,
+            log.AsyncWriter(self._cfg["global"].get("log queue size", 1024))
+                if self._cfg["global"].get("log mode", "sync") == "async"
+                else None,
+            output_directory
+        )
 
-        logger = log.Logger.new()
-
-        agent_directory = directory.Directory()
+        agent_directory = directory.Directory(
+            self._cfg["global"].get("message history", "all"),
+            self._cfg["global"].get("message history size")
+        )
         agent_factory = entities.AgentFactory(agent_directory, self._cfg)
 
         # Create government and municipality,
@@ -129,6 +164,21 @@ class Simulation(object):
 
         return do.Simulation.from_simulation_info(info, self._cfg)
 
+    def close(self):
+        """Closes the log files of the simulation, if it has been 
+        initialized."""
+        if not self._round is None:
+            self._round.info.logger.close()
+
+    def get_round_number(self):
+        """Returns the number of completed rounds."""
+        return self._round.rounds()
+
+    def get_last_round_statistics(self):
+        """Returns the statistics of the last completed round, as a dict of
+        values by statistic name."""
+        return self._round.info.logger.get_last_round_statistics()
+
     def get_current_phase(self):
         """Returns the current phase of the simulation."""
         return self._round.current()
@@ -0,0 +1,140 @@
+"""
+The sweep module runs parameter sweeps: a simulation for every combination of
+configuration values, each replicated with different seeds, in parallel 
+processes. Each run writes its logs in its own directory, and the statistics
+of the last round of every run are gathered into one table.
+"""
+
+import os
+import json
+import random
+import itertools
+import multiprocessing
+from collections import namedtuple
+
+import numpy
+
+from FisherSimulation import simulation
+
+TABLE_FILENAME = "sweep.csv"
+
+SweepRun = namedtuple("SweepRun", [
+    "number",
+    "values",
+    "replicate",
+    "seed",
+    "output_directory"
+])
+
+def sweep_runs(axes, replicates, output_directory, seed=0):
+    """Lists the runs of a sweep.
+    
+    Arguments:
+        axes:               A list of (path, values) tuples, where path is a
+                            dot separated configuration key path like
+                            "global.aquaculture damage proportion"
+        replicates:         The number of runs for each combination of values
+        output_directory:   The directory to put the run directories in
+        seed:               The seed of the first run, runs are seeded with
+                            consecutive numbers
+        
+    Returns:
+        A list of SweepRun instances, for every combination of axis values
+        and every replicate.
+    """
+    paths = [path for path, __ in axes]
+    runs = []
+    for values in itertools.product(*[values for __, values in axes]):
+        for replicate in xrange(replicates):
+            number = len(runs)
+            runs.append(SweepRun(
+                number,
+                dict(zip(paths, values)),
+                replicate,
+                seed + number,
+                os.path.join(output_directory, "run%04d" % number)
+            ))
+    return runs
+    
+def run_simulation(config_filename, run, rounds):
+    """Runs a simulation for a number of rounds. The random generators are
+    seeded with the run's seed, but this only decorrelates the replicates:
+    the simulation iterates over sets and dicts of agents and cells, which
+    are ordered by object ids, so runs with the same seed aren't 
+    reproducible.
+    
+    Returns:
+        The statistics of the last round, as a dict of values by name.
+    """
+    random.seed(run.seed)
+    numpy.random.seed(run.seed)
+    s = simulation.Simulation()
+    s.setup_config(config_filename, run.values)
+    s.initialize(run.output_directory)
+    try:
+        while s.get_round_number() < rounds:
+            s.step()
+        return s.get_last_round_statistics()
+    finally:
+        s.close()
+        
+def _run_simulation(args):
+    # Pool.map calls functions with a single argument
+    return run_simulation(*args)
+    
+def sweep(config_filename, axes, replicates, rounds, output_directory="sweep",
+        processes=None, seed=0):
+    """Runs a sweep over a pool of processes, and writes the statistics of 
+    the last round of every run in sweep.csv in the output directory.
+    
+    Arguments:
+        config_filename:    The base configuration file
+        axes:               A list of (path, values) tuples, see sweep_runs
+        replicates:         The number of runs for each combination of values
+        rounds:             The number of rounds to run each simulation
+        output_directory:   The directory of the table and run directories
+        processes:          The number of processes, by default the number
+                            of CPUs
+        seed:               The seed of the first run
+        
+    Returns:
+        A list of (SweepRun, statistics) tuples, in run order.
+    """
+    runs = sweep_runs(axes, replicates, output_directory, seed)
+    if not os.path.isdir(output_directory):
+        os.makedirs(output_directory)
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = pool.map(
+            _run_simulation, 
+            [(config_filename, run, rounds) for run in runs], 
+            chunksize=1
+        )
+    finally:
+        pool.close()
+        pool.join()
+    write_table(os.path.join(output_directory, TABLE_FILENAME), 
+        [path for path, __ in axes], runs, results)
+    return zip(runs, results)
+    
+def write_table(filename, paths, runs, results):
+    """Writes a row for every run, with the run's number, replicate, seed,
+    axis values and statistics."""
+    keys = []
+    for statistics in results:
+        keys += [k for k in statistics if k != "round" and not k in keys]
+    def value(e):
+        if e is None: return ""
+        if isinstance(e, float): return "%.10f" % e
+        if isinstance(e, basestring): return e.replace(",", "")
+        return json.dumps(e).replace(",", "")
+    with open(filename, "w") as file:
+        file.write(",".join(c.replace(",", "") for c in 
+            ["run", "replicate", "seed", "round"] + paths + keys) + "\n")
+        for run, statistics in zip(runs, results):
+            file.write(",".join(value(e) for e in 
+                [run.number, run.replicate, run.seed, 
+                    statistics.get("round")] +
+                [run.values[path] for path in paths] +
+                [statistics.get(key) for key in keys]
+            ) + "\n")
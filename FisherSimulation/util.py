@@ -1,5 +1,7 @@
 """Utility library for FisherSimulation."""
 
+import random
+
 def smart_line_sep(words, separator, char_limit, line_separator):
     """Join words by a separator, but limited by a line limit.
 
@@ -50,4 +52,46 @@ def update_map(old, updates):
 
     return [[old_cell if new_cell is None else new_cell 
         for (old_cell, new_cell) in zip(*row)] 
-            for row in zip(old, updates)]
\ No newline at end of file
+            for row in zip(old, updates)]
+
+
+class IndexedSet(object):
+    """A set of hashable items that supports uniform random choice.
+
+    Items are kept in a list, with a dictionary mapping each item to its index
+    in the list. Removal swaps the last item into the freed index, so adding,
+    removing and choosing are all constant-time.
+    """
+
+    def __init__(self, items=()):
+        self._items = []
+        self._index = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if not item in self._index:
+            self._index[item] = len(self._items)
+            self._items.append(item)
+
+    def discard(self, item):
+        i = self._index.pop(item, None)
+        if i is None:
+            return
+        last = self._items.pop()
+        if i < len(self._items):
+            self._items[i] = last
+            self._index[last] = i
+
+    def choice(self):
+        """Returns a uniformly random item. Raises IndexError if empty."""
+        return random.choice(self._items)
+
+    def __contains__(self, item):
+        return item in self._index
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
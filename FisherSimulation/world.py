@@ -5,7 +5,9 @@ and contents of the world. This includes structure, and contents of map cells.
 
 import random
 import math
+import numpy
 import entities
+import util
 
 class Map(object):
     """
@@ -19,14 +21,28 @@ class Map(object):
 
     def set_structure(self, structure):
         self._structure = structure
+        self._max_distance = None
 
     def get_structure(self):
         return self._structure
 
     def get_max_distance(self):
-        return self._structure.get_distance(
-            (0, 0), tuple([e - 1 for e in self._structure.get_size()])
-        )
+        if self._max_distance is None:
+            self._max_distance = self._structure.get_distance(
+                (0, 0), tuple([e - 1 for e in self._structure.get_size()])
+            )
+        return self._max_distance
+
+    def get_normalized_distances_from(self, cell):
+        """Gives the distances from the given cell to every cell, divided by
+        the maximum distance in the map.
+
+        Returns:
+            A NumPy array indexed by cell position.
+        """
+        return self._structure.get_distances_from(
+            self._structure.get_cell_position(cell)
+        ) / self.get_max_distance()
 
     def get_random_cell(self, predicate = None):
         return random.choice(self.get_all_cells(predicate))
@@ -50,19 +66,36 @@ class Map(object):
     def get_cell_distance(self, a, b):
         return self._structure.get_cell_distance(a, b)
 
+    def get_num_cells(self):
+        w, h = self._structure.get_size()
+        return w * h
+
+    def get_total_fish_quantity(self):
+        return self._structure.get_total_fish_quantity()
+
+    def get_num_unblocked_cells(self):
+        return self._structure.get_num_unblocked_cells()
+
+    def get_random_free_cell(self):
+        """Draws a uniformly random unblocked cell.
+
+        Returns:
+            A Slot instance, or None if every cell is blocked.
+        """
+        free_cells = self._structure.get_free_cells()
+        return free_cells.choice() if len(free_cells) > 0 else None
+
     def build_aquaculture(self, agent, cell):
         radius = self._structure.get_aquaculture_blocking(cell)
-        damage = self._structure.get_aquaculture_damage(cell)
         for b in radius:
             if not b == cell:
                 b.block()
 
-        for c in damage:
-            c.inflict_damage(damage[c])
+        damaged = self._structure.inflict_aquaculture_damage(cell)
 
         cell.build_aquaculture(agent)
 
-        return radius + damage.keys()
+        return radius + damaged
 
     def get_radius_from(self, cell, r):
         return self.get_radius(r, self._structure.get_cell_position(cell))
@@ -77,18 +110,61 @@ class Map(object):
 #   fish_spawning():        indicates if the current slot is a good fishing spot
 # Assume that all occupants can be converted to strings
 
-class Slot(object):
-    def __init__(self, occupants=None):
+class AbstractSlot(object):
+    """The occupants, position and free cell index shared by Slot and 
+    ArraySlot, which store the rest of the cell state in their own way."""
+
+    __slots__ = ("_occupants", "_position", "_free_cells")
+
+    def __init__(self, occupants=None, position=None):
         self._occupants = occupants or []
+        self._position = position
+        self._free_cells = None
+
+    def get_occupants(self):
+        return self._occupants
+
+    def get_position(self, world_map):
+        """Finds the position of this cell in the world map.
+
+        Parameters:
+            world_map:  A Map object
+
+        Returns:
+            A tuple of integers (x, y) representing the location in coordinate
+            form.
+        """
+        if self._position is not None:
+            return self._position
+        return world_map.get_structure().get_cell_position(self)
+
+    def set_free_cells_index(self, free_cells):
+        """Makes this cell keep the given util.IndexedSet of unblocked cells up
+        to date, adding itself to it if it is not blocked."""
+        self._free_cells = free_cells
+        if not self.is_blocked():
+            free_cells.add(self)
+
+    def populate(self, agent):
+        if not agent in self._occupants:
+            self._occupants.append(agent)
+
+    def remove(self, agent):
+        if agent in self._occupants:
+            self._occupants.remove(agent)
+
+class Slot(AbstractSlot):
+    __slots__ = ("_spawning", "_blocked", "_land", "_has_aquaculture", 
+        "_fish_quantity")
+
+    def __init__(self, occupants=None, position=None):
+        AbstractSlot.__init__(self, occupants, position)
         self._spawning = False
         self._blocked = False
         self._land = False
         self._has_aquaculture = False
         self._fish_quantity = 0.5
 
-    def get_occupants(self):
-        return self._occupants
-
     def is_blocked(self):
         return self._blocked
 
@@ -114,18 +190,6 @@ class Slot(object):
     def set_land(self):
         self._land = True
 
-    def get_position(self, world_map):
-        """Finds the position of this cell in the world map.
-
-        Parameters:
-            world_map:  A Map object
-
-        Returns:
-            A tuple of integers (x, y) representing the location in coordinate
-            form.
-        """
-        return world_map.get_structure().get_cell_position(self)
-
     def set_fish_spawning(self):
         self._spawning = True
         self._fish_quantity = 1.0
@@ -147,19 +211,83 @@ class Slot(object):
 
     def block(self):
         self._blocked = True
+        if self._free_cells is not None:
+            self._free_cells.discard(self)
 
-    def populate(self, agent):
-        if not agent in self._occupants:
-            self._occupants.append(agent)
+    def build_aquaculture(self, agent):
+        self._has_aquaculture = True
+        self._occupants = [agent]
+        self.block()
 
-    def remove(self, agent):
-        if agent in self._occupants:
-            self._occupants.remove(agent)
+class ArraySlot(AbstractSlot):
+    """A Slot whose state is stored at one index of the arrays in an
+    ArrayState. Only the occupants are kept in the object itself, and the
+    position doubles as the array index.
+    """
+
+    __slots__ = ("_state",)
+
+    def __init__(self, state, position, occupants=None):
+        AbstractSlot.__init__(self, occupants, position)
+        self._state = state
+
+    def is_blocked(self):
+        return bool(self._state.blocked[self._position])
+
+    def is_land(self):
+        return bool(self._state.land[self._position])
+
+    def inflict_damage(self, damage):
+        quantity = self._state.fish_quantity
+        quantity[self._position] -= quantity[self._position] * damage
+
+    def has_aquaculture(self):
+        return bool(self._state.aquaculture[self._position])
+
+    def set_land(self):
+        self._state.land[self._position] = True
+
+    def set_fish_spawning(self):
+        self._state.spawning[self._position] = True
+        self._state.fish_quantity[self._position] = 1.0
+
+    def get_fish_quantity(self):
+        return float(self._state.fish_quantity[self._position])
+
+    def get_fishing_efficiency(self):
+        return self.get_fish_quantity() / len(self._occupants)
+
+    def fish_spawning(self):
+        return bool(self._state.spawning[self._position])
+
+    def block(self):
+        self._state.blocked[self._position] = True
+        if self._free_cells is not None:
+            self._free_cells.discard(self)
 
     def build_aquaculture(self, agent):
-        self._has_aquaculture = True
+        self._state.aquaculture[self._position] = True
         self._occupants = [agent]
-        self._blocked = True
+        self.block()
+
+class ArrayState(object):
+    """Struct-of-arrays storage for the state of every cell in a structure.
+
+    Attributes:
+        fish_quantity:  A float array of the fish quantity in each cell
+        spawning:       A boolean array, True for good fishing spots
+        blocked:        A boolean array, True for blocked cells
+        land:           A boolean array, True for land cells
+        aquaculture:    A boolean array, True for cells with aquaculture
+    """
+
+    def __init__(self, shape):
+        self.fish_quantity = numpy.empty(shape, dtype=numpy.float64)
+        self.fish_quantity.fill(0.5)
+        self.spawning = numpy.zeros(shape, dtype=numpy.bool_)
+        self.blocked = numpy.zeros(shape, dtype=numpy.bool_)
+        self.land = numpy.zeros(shape, dtype=numpy.bool_)
+        self.aquaculture = numpy.zeros(shape, dtype=numpy.bool_)
 
 class MapStructure(object):
     """Interface showing methods that need to be implemented for a
@@ -209,6 +337,20 @@ class MapStructure(object):
 
         raise NotImplementedError()
 
+    def get_distances_from(self, pos):
+        """Finds the distances in meters from the given position to every
+        position in the structure.
+
+        Parameters:
+            pos A duple of two integers representing the position
+
+        Returns:
+            A NumPy array of floating-point numbers indexed by position, so
+            that the distance to (x, y) is found at [x, y].
+        """
+
+        raise NotImplementedError()
+
     def get_size(self):
         """Gives the size of the structure.
 
@@ -227,6 +369,34 @@ class MapStructure(object):
 
         raise NotImplementedError()
 
+    def get_total_fish_quantity(self):
+        """Sums the fish quantity over all cells in the structure.
+
+        Returns:
+            A floating-point number.
+        """
+
+        raise NotImplementedError()
+
+    def get_num_unblocked_cells(self):
+        """Counts the cells in the structure that are not blocked.
+
+        Returns:
+            An integer.
+        """
+
+        raise NotImplementedError()
+
+    def get_free_cells(self):
+        """Gives the cells in the structure that are not blocked.
+
+        Returns:
+            A util.IndexedSet of Slot instances, kept up to date as cells are
+            blocked.
+        """
+
+        raise NotImplementedError()
+
     def get_aquaculture_blocking(self, cell):
         """Gets all the cells that will or would be blocked by aquaculture
         expansion in the given cell.
@@ -264,6 +434,19 @@ class MapStructure(object):
 
         raise NotImplementedError()
 
+    def inflict_aquaculture_damage(self, cell):
+        """Inflicts the damage from aquaculture expansion in the given cell,
+        as given by get_aquaculture_damage, on the damaged cells.
+
+        Attributes:
+            cell    The Slot where aquaculture is being built.
+
+        Returns:
+            A list of the damaged Slot instances.
+        """
+
+        raise NotImplementedError()
+
     def get_cell_position(self, cell):
         """Gets the position of the given cell.
 
@@ -294,6 +477,7 @@ class MapStructure(object):
 # Abstract Structure class
 class AbstractStructure(MapStructure):
     def __init__(self, cfg):
+        self._positions = {}    # cell to (x, y), filled by initialize_slots
         self._aquaculture_blocking_radius = \
             cfg.globals["aquaculture blocking radius"]
         self._aquaculture_damage_radius = \
@@ -311,7 +495,22 @@ class AbstractStructure(MapStructure):
         return None
 
     def get_cell_position(self, cell):
-        return self.get_position(lambda x, y: cell is self.slots[x][y])
+        return self._positions.get(cell)
+
+    def index_positions(self):
+        """ Rebuilds the cell to position index from the slot grid. """
+        self._positions = {
+            self.slots[x][y]: (x, y) for (x, y) in self.get_coordinates_list()
+        }
+
+    def index_free_cells(self):
+        """ Rebuilds the set of unblocked cells from the slot grid. """
+        self._free_cells = util.IndexedSet()
+        for s in self.get_all_slots():
+            s.set_free_cells_index(self._free_cells)
+
+    def get_free_cells(self):
+        return self._free_cells
 
     def get_occupant_position(self, occupant):
         return self.get_position(
@@ -345,6 +544,12 @@ class AbstractStructure(MapStructure):
         damage[cell] = float(prop)
         return damage
 
+    def inflict_aquaculture_damage(self, cell):
+        damage = self.get_aquaculture_damage(cell)
+        for c in damage:
+            c.inflict_damage(damage[c])
+        return damage.keys()
+
     def get_aquaculture_blocking(self, cell):
         pos = self.get_cell_position(cell)
         return self.get_radius(self._aquaculture_blocking_radius, pos)
@@ -375,6 +580,12 @@ class AbstractStructure(MapStructure):
         """ Return a list of all the slots """
         return [self.slots[x][y] for (x, y) in self.get_coordinates_list()]
 
+    def get_total_fish_quantity(self):
+        return float(sum(s.get_fish_quantity() for s in self.get_all_slots()))
+
+    def get_num_unblocked_cells(self):
+        return sum(1 for s in self.get_all_slots() if not s.is_blocked())
+
     def get_positions_if_valid(self, positions):
         valid_positions = [(x, y) for (x, y) in positions if self.in_bounds(x, y)]
         return [self.slots[x][y] for (x, y) in valid_positions]
@@ -389,16 +600,82 @@ class AbstractStructure(MapStructure):
     def size(self):
         raise NotImplementedError
 
+class DistanceCache(object):
+    """Caches the distances from positions in a structure to every other
+    position.
+
+    In dense mode the full matrix of pairwise distances is built on first use.
+    Otherwise the distance array from each position is computed when it is
+    first asked for. The "auto" mode picks dense mode for structures with at
+    most DENSE_LIMIT cells.
+    """
+
+    DENSE_LIMIT = 1024
+
+    def __init__(self, structure, mode="auto"):
+        assert mode in ("auto", "dense", "rows"), \
+            "Unknown distance cache mode: %s" % mode
+        w, h = structure.get_size()
+        self._structure = structure
+        self._dense = mode == "dense" or \
+            (mode == "auto" and w * h <= DistanceCache.DENSE_LIMIT)
+        self._matrix = None
+        self._rows = {}
+
+    def get_row(self, pos):
+        if self._dense:
+            if self._matrix is None:
+                w, h = self._structure.get_size()
+                self._matrix = numpy.array([
+                    [self._structure.compute_distances_from((x, y))
+                        for y in xrange(h)] for x in xrange(w)
+                ])
+                self._matrix.setflags(write=False)
+            return self._matrix[pos]
+        if not pos in self._rows:
+            row = self._structure.compute_distances_from(pos)
+            row.setflags(write=False)
+            self._rows[pos] = row
+        return self._rows[pos]
+
 # FishingStructure to hold general method for initializing good fishing spots
 class FishingStructure(AbstractStructure):
     def __init__(self, cfg, good_spot_frequency):
         AbstractStructure.__init__(self, cfg)
         self.cell_size = (cfg["cell width"], cfg["cell height"])
+        self._radius_offsets = {}   # (r, cell_size) to list of offsets
+        self._damage_stencils = {}  # (r, proportion, cell_size) to stencil
         self.initialize_slots(cfg["width"], cfg["height"])
         self.initialize_fishing_spots(good_spot_frequency)
+        cache_mode = cfg.get("distance cache")
+        self._distance_cache = None if not cache_mode else \
+            DistanceCache(self, "auto" if cache_mode is True else cache_mode)
+
+    def get_distance(self, pos_a, pos_b):
+        if self._distance_cache is not None:
+            return float(self._distance_cache.get_row(pos_a)[pos_b])
+        return self.compute_distance(pos_a, pos_b)
+
+    def get_distances_from(self, pos):
+        if self._distance_cache is not None:
+            return self._distance_cache.get_row(pos)
+        return self.compute_distances_from(pos)
+
+    def compute_distance(self, pos_a, pos_b):
+        """ Computes the distance between two positions, bypassing the
+        distance cache. """
+        raise NotImplementedError
+
+    def compute_distances_from(self, pos):
+        """ Computes the distances from a position to every position as an
+        array, bypassing the distance cache. """
+        raise NotImplementedError
 
     def initialize_slots(self, width, height):
-        self.slots = [[Slot() for _ in xrange(width)] for _ in xrange(height)]
+        self.slots = [[Slot(position=(x, y)) for y in xrange(width)]
+            for x in xrange(height)]
+        self.index_positions()
+        self.index_free_cells()
 
     def initialize_fishing_spots(self, good_spot_frequency):
         slots = self.get_all_slots()
@@ -407,31 +684,110 @@ class FishingStructure(AbstractStructure):
         for s in random.sample(slots, int(num_good_spots)):
             s.set_fish_spawning()
 
+    def get_radius_offsets(self, r):
+        """Gives the cell offsets within a radius of r meters, excluding the
+        center cell itself. The table is computed once per radius and cached.
+
+        Parameters:
+            r   An integer representing the radius in meters.
+
+        Returns:
+            A list of duples of integers (dx, dy).
+        """
+        key = (r, self.cell_size)
+        if not key in self._radius_offsets:
+            sx, sy = self.cell_size
+            self._radius_offsets[key] = [(dx, dy) for
+                dx in xrange(-(r / sx), r / sx + 1) for
+                dy in xrange(-(r / sy), r / sy + 1) if
+                    (dx, dy) != (0, 0) and
+                    (dx * sx) ** 2 + (dy * sy) ** 2 <= r ** 2]
+        return self._radius_offsets[key]
+
+    def get_radius(self, r, (x, y)):
+        return self._get_at_offsets(self.get_radius_offsets(r), x, y)
+
+    def get_damage_stencil(self, r, proportion):
+        """Gives the damage falloff around an aquaculture site as offset and
+        damage arrays. Damage falls linearly from the proportion at the center
+        to 0 at r meters. The center is the last element, so that it wins over
+        any cell that the radius wraps back onto. Cached per radius and
+        proportion.
+
+        Parameters:
+            r           An integer representing the damage radius in meters.
+            proportion  A number between 0 and 1, the damage at the center.
+
+        Returns:
+            A triple of NumPy arrays (dx, dy, damage).
+        """
+        key = (r, proportion, self.cell_size)
+        if not key in self._damage_stencils:
+            offsets = self.get_radius_offsets(r)
+            sx, sy = self.cell_size
+            dx = numpy.array([o[0] for o in offsets] + [0], dtype=numpy.int64)
+            dy = numpy.array([o[1] for o in offsets] + [0], dtype=numpy.int64)
+            distances = numpy.hypot(dx[:-1] * sx, dy[:-1] * sy)
+            damage = numpy.append(
+                float(proportion) * (r - distances) / (r or 1),
+                float(proportion)
+            )
+            self._damage_stencils[key] = (dx, dy, damage)
+        return self._damage_stencils[key]
+
+    def get_aquaculture_damage_indices(self, cell):
+        """Applies the aquaculture damage stencil at the given cell.
+
+        Returns:
+            A triple of NumPy arrays (xs, ys, damage) with the positions of
+            the damaged cells and the damage sustained to each.
+        """
+        x, y = self.get_cell_position(cell)
+        dx, dy, damage = self.get_damage_stencil(
+            self._aquaculture_damage_radius,
+            self._aquaculture_damage_proportion
+        )
+        xs, ys, keep = self._get_indices_at_offsets(dx, dy, x, y)
+        return xs[keep], ys[keep], damage[keep]
+
+    def get_aquaculture_damage(self, cell):
+        xs, ys, damage = self.get_aquaculture_damage_indices(cell)
+        return {self.slots[x][y]: d for x, y, d in
+            zip(xs.tolist(), ys.tolist(), damage.tolist())}
+
+    def _get_indices_at_offsets(self, dx, dy, x, y):
+        """ Return position arrays at the offsets (dx, dy) from the point
+        (x, y), and a boolean array selecting the valid positions """
+        raise NotImplementedError
+
 class GridStructure(FishingStructure):
     def in_bounds(self, x, y):
         w, h = self.get_size()
         return w > x >= 0 and h > y >= 0
 
-    def get_distance(self, (a_x, a_y), (b_x, b_y)):
+    def compute_distance(self, (a_x, a_y), (b_x, b_y)):
         cell_x, cell_y = self.cell_size
         return math.sqrt(
             ((b_x - a_x) * cell_x) ** 2 +
             ((b_y - a_y) * cell_y) ** 2
         )
 
-    def get_radius(self, r, (x, y)):
-        sx, sy = self.cell_size
-        offsets = [e for subl in [
-            [(  0, yy), (  0, -yy),
-             ( xx, 0),  ( xx,  yy), ( xx, -yy),
-             (-xx, 0),  (-xx,  yy), (-xx, -yy)] for
-                xx in xrange(1, r/sx + 1) for
-                yy in xrange(1, r/sy + 1)] for e in subl]
-        return self._get_at_offsets(offsets, x, y)
+    def compute_distances_from(self, (x, y)):
+        cell_x, cell_y = self.cell_size
+        w, h = self.get_size()
+        return numpy.hypot(
+            (numpy.arange(w) - x)[:, numpy.newaxis] * cell_x,
+            (numpy.arange(h) - y)[numpy.newaxis, :] * cell_y
+        )
 
     def _get_at_offsets(self, o, x, y):
         return self.get_positions_if_valid([(x + X, y + Y) for (X, Y) in o])
 
+    def _get_indices_at_offsets(self, dx, dy, x, y):
+        w, h = self.get_size()
+        xs, ys = dx + x, dy + y
+        return xs, ys, (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+
 # TorusStructure represents a kind of grid structure that wraps around both
 # horizontally and vertically. That means the neighborhood and radius
 # methods are different from GridStructure.
@@ -444,7 +800,7 @@ class TorusStructure(FishingStructure):
         w, h = self.get_size()
         return (x % w, y % h)
 
-    def get_distance(self, (a_x, a_y), (b_x, b_y)):
+    def compute_distance(self, (a_x, a_y), (b_x, b_y)):
         cell_x, cell_y = self.cell_size
         w, h = self.get_size()
         offsets = ((-w, -h), (-w, 0), (-w, h),
@@ -455,17 +811,49 @@ class TorusStructure(FishingStructure):
             ((a_y - b_y + dy) * cell_y) ** 2
         ) for (dx, dy) in offsets)
 
-    def get_radius(self, r, (x, y)):
-        sx, sy = self.cell_size
-        # In each direction
-        offsets = [e for subl in [
-            [(  0, yy), (  0, -yy),
-             ( xx, 0),  ( xx,  yy), ( xx, -yy),
-             (-xx, 0),  (-xx,  yy), (-xx, -yy)] for
-                xx in xrange(1, r/sx + 1) for
-                yy in xrange(1, r/sy + 1)] for e in subl]
-        return self._get_at_offsets(offsets, x, y)
+    def compute_distances_from(self, (x, y)):
+        cell_x, cell_y = self.cell_size
+        w, h = self.get_size()
+        dx = numpy.abs(numpy.arange(w) - x)
+        dy = numpy.abs(numpy.arange(h) - y)
+        return numpy.hypot(
+            numpy.minimum(dx, w - dx)[:, numpy.newaxis] * cell_x,
+            numpy.minimum(dy, h - dy)[numpy.newaxis, :] * cell_y
+        )
 
     def _get_at_offsets(self, o, x, y):
         return [self.slots[X][Y] for (X, Y) in
-            [self._absolute(x + xx, y + yy) for (xx, yy) in o]]
\ No newline at end of file
+            [self._absolute(x + xx, y + yy) for (xx, yy) in o]]
+
+    def _get_indices_at_offsets(self, dx, dy, x, y):
+        w, h = self.get_size()
+        return (dx + x) % w, (dy + y) % h, numpy.ones(len(dx), numpy.bool_)
+
+# ArrayStructure replaces the slot objects of a FishingStructure with views
+# over an ArrayState, so whole-map aggregates become array reductions. It is
+# mixed in before a concrete structure, which keeps providing the geometry.
+class ArrayStructure(object):
+    def initialize_slots(self, width, height):
+        self.state = ArrayState((height, width))
+        self.slots = [[ArraySlot(self.state, (x, y)) for y in xrange(width)]
+            for x in xrange(height)]
+        self.index_positions()
+        self.index_free_cells()
+
+    def get_total_fish_quantity(self):
+        return float(self.state.fish_quantity.sum())
+
+    def get_num_unblocked_cells(self):
+        return int(self.state.blocked.size - self.state.blocked.sum())
+
+    def inflict_aquaculture_damage(self, cell):
+        xs, ys, damage = self.get_aquaculture_damage_indices(cell)
+        quantity = self.state.fish_quantity
+        quantity[xs, ys] -= quantity[xs, ys] * damage
+        return [self.slots[x][y] for x, y in zip(xs.tolist(), ys.tolist())]
+
+class ArrayGridStructure(ArrayStructure, GridStructure):
+    pass
+
+class ArrayTorusStructure(ArrayStructure, TorusStructure):
+    pass
@@ -163,8 +163,11 @@ def input_or_default(str, default):
         
 def main():
     cli = CommandLineInterface()
-    cli.start()
-    cli.exit()
+    try:
+        cli.start()
+        cli.exit()
+    finally:
+        cli.simulation.close()
     
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,37 @@
+"""Command line interface for parameter sweeps. Example:
+
+    python -m cli.sweep config/config.js --replicates 10 --rounds 50 \\
+        --axis "government.complaint approval probability=[0.1, 0.5, 0.9]"
+"""
+
+import sys
+import json
+import argparse
+from FisherSimulation import sweep
+
+def parse_axis(text):
+    path, values = text.split("=", 1)
+    values = json.loads(values)
+    assert isinstance(values, list), "Axis values must be a JSON list."
+    return path.strip(), values
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs a parameter sweep.")
+    parser.add_argument("config", help="the base configuration file")
+    parser.add_argument("--axis", action="append", default=[], 
+        type=parse_axis, metavar="PATH=VALUES",
+        help="a dot separated configuration key path and a JSON list of " +
+            "values, may be given many times")
+    parser.add_argument("--replicates", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--output", default="sweep", 
+        help="the output directory")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    results = sweep.sweep(args.config, args.axis, args.replicates, 
+        args.rounds, args.output, args.processes, args.seed)
+    print "%d runs done, statistics in %s." % (len(results), args.output)
+    
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,15 @@
         "aquaculture blocking radius":      25,
         "aquaculture damage radius":        50,
         "aquaculture damage proportion":    1,
-        "aquaculture in blocked":           false
+        "aquaculture in blocked":           false,
+        "message history":                  "all",
+        "message history size":             null,
+        "log flush":                        "round",
+        "run archive":                      false,
+        "archive save rounds":              10,
+        "log mode":                         "sync",
+        "log queue size":                   1024,
+        "output directory":                 null
     },
     "world": {
         "structure": {
@@ -16,7 +24,8 @@
             "width":                       15,
             "height":                      15,
             "cell width":                  25,
-            "cell height":                 25
+            "cell height":                 25,
+            "distance cache":              null
         },
         "good spot frequency": 0.1
     },
@@ -48,6 +57,7 @@
             },
             "elitism":              3,
             "selection mechanism":  "rank selection",
+            "mating scheme":        "all pairs",
             "crossover rate":       0.005,
             "mutation rate":        0.005,
             "genome mutation rate": 0.00005
@@ -28,9 +28,22 @@ class Config(dict):
             return Config(item, self.globals)
         return item
 
-def load(varargs = None, filename = cfg_json_filename):
+def load(varargs = None, filename = cfg_json_filename, overrides = None):
     with open(filename, 'r') as f:
-        return process_config(json.load(f))
+        cfg = json.load(f)
+    for path in overrides or {}:
+        set_value(cfg, path, overrides[path])
+    return process_config(cfg)
+    
+def set_value(cfg, path, value):
+    """Sets a value in an unprocessed configuration, by a dot separated path
+    of keys such as "global.aquaculture damage proportion"."""
+    keys = path.split(".")
+    for key in keys[:-1]:
+        assert key in cfg, "Configuration key %s doesn't exist" % key
+        cfg = cfg[key]
+    assert keys[-1] in cfg, "Configuration key %s doesn't exist" % keys[-1]
+    cfg[keys[-1]] = value
         
 def process_config(cfg):
     cfg = convert_priorities(cfg)
@@ -50,6 +50,8 @@ def EVT_STOP(win, func):
 class Window(wx.Frame):
     def __init__(self, parent, title):
         wx.Frame.__init__(self, parent, title=title)
+        self._simulation = None
+        self.worker = None
 
         # Splitters and Panels
         self.controls_map_splitter = wx.SplitterWindow(self)
@@ -124,10 +126,21 @@ class Window(wx.Frame):
         self.messages.clear()
         self.graphs.reset_data()
 
+    def close_simulation(self):
+        """Waits for the step in progress, and closes the simulation's log
+        files. The result of the step is ignored by OnResult, since the 
+        worker is discarded."""
+        if not self.worker is None:
+            self.worker.join()
+            self.worker = None
+        if not self._simulation is None:
+            self._simulation.close()
+
     # Event Methods
     def OnStart(self, event):
         self.controls.set_buttons_ready()
 
+        self.close_simulation()
         self._simulation = simulation.Simulation()
 
         self._simulation.setup_config(self.controls.get_config_filename())
@@ -193,12 +206,14 @@ class Window(wx.Frame):
 
     def OnStop(self, event):
         self.reset_gui()
+        self.close_simulation()
         self._simulation = None
         self.worker = None
         self.simulation_info = None
 
     def OnClose(self, event):
         # TODO: Fix
+        self.close_simulation()
         self.Destroy()
 
 def handle_statistics(graphs, round, data):
@@ -0,0 +1,21 @@
+from config import config
+import unittest
+
+class SetValueTest(unittest.TestCase):
+    def setUp(self):
+        self.cfg = {"global": {"a": 1, "b": {"c": 2}}}
+
+    def test_set_value(self):
+        config.set_value(self.cfg, "global.b.c", 3)
+        config.set_value(self.cfg, "global.a", [4])
+        self.assertEqual({"global": {"a": [4], "b": {"c": 3}}}, self.cfg)
+
+    def test_missing_key(self):
+        self.assertRaises(AssertionError, 
+            config.set_value, self.cfg, "global.d.c", 3)
+        self.assertRaises(AssertionError, 
+            config.set_value, self.cfg, "global.b.d", 3)
+        self.assertEqual({"global": {"a": 1, "b": {"c": 2}}}, self.cfg)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import directory
+import unittest
+
+class Fisherman(object):
+    def __init__(self):
+        self.received = []
+
+    def receive_message(self, source, message):
+        self.received.append(message)
+
+class Government(object):
+    pass
+
+class DirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = directory.Directory()
+        self.fishermen = [Fisherman() for _ in xrange(3)]
+        self.government = Government()
+        for agent in self.fishermen[:2]:
+            self.directory.register_communicating_agent(agent, Fisherman, 
+                voting=True)
+        self.directory.register_communicating_agent(self.government, 
+            Government)
+        self.directory.register_communicating_agent(self.fishermen[2], 
+            Fisherman)
+
+    def test_get_agents(self):
+        agents = self.directory.get_agents()
+        self.assertIsInstance(agents, tuple)
+        self.assertEqual(tuple(self.fishermen[:2]) + 
+            (self.government, self.fishermen[2]), agents)
+        self.assertEqual(tuple(self.fishermen), 
+            self.directory.get_agents(type=Fisherman))
+        self.assertEqual((self.government,), 
+            self.directory.get_agents(type=Government))
+        self.assertEqual((), self.directory.get_agents(type=str))
+        self.assertEqual(tuple(self.fishermen[1:]), self.directory.get_agents(
+            type=Fisherman, exclude=self.fishermen[0]))
+        self.assertEqual((self.fishermen[2],), self.directory.get_agents(
+            predicate=lambda a: a is self.fishermen[2]))
+
+    def test_get_voting_agents(self):
+        agents = self.directory.get_voting_agents()
+        self.assertIsInstance(agents, tuple)
+        self.assertEqual(tuple(self.fishermen[:2]), agents)
+        self.assertEqual(tuple(self.fishermen[:2]), 
+            self.directory.get_agents(type=Fisherman, only_voters=True))
+        self.assertEqual((), 
+            self.directory.get_agents(type=Government, only_voters=True))
+
+    def test_views_follow_changes(self):
+        self.directory.get_agents(type=Fisherman)
+        self.directory.get_voting_agents()
+        other = Fisherman()
+        self.directory.register_communicating_agent(other, Fisherman, 
+            voting=True)
+        self.assertTrue(self.directory.in_catalogue(other))
+        self.assertEqual(tuple(self.fishermen) + (other,), 
+            self.directory.get_agents(type=Fisherman))
+        self.assertEqual(tuple(self.fishermen[:2]) + (other,), 
+            self.directory.get_voting_agents())
+        self.directory.unregister_communicating_agent(self.fishermen[0])
+        self.assertFalse(self.directory.in_catalogue(self.fishermen[0]))
+        self.assertEqual(tuple(self.fishermen[1:]) + (other,), 
+            self.directory.get_agents(type=Fisherman))
+        self.assertEqual((self.fishermen[1], other), 
+            self.directory.get_voting_agents())
+        self.assertEqual((self.fishermen[1], self.government, 
+            self.fishermen[2], other), self.directory.get_agents())
+
+class MetaInfo(object):
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+
+class Message(object):
+    def __init__(self, source, target):
+        self.metainfo = MetaInfo(source, target)
+
+class MessageHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.source, self.target = Fisherman(), Fisherman()
+
+    def send(self, directory, n):
+        messages = [Message(self.source, self.target) for _ in xrange(n)]
+        for message in messages:
+            directory.send_message(message)
+        return messages
+
+    def record(self, directory, n):
+        directory.start_recording()
+        messages = self.send(directory, n)
+        return messages, directory.stop_recording()
+
+    def directory(self, history, size=None):
+        d = directory.Directory(history, size)
+        d.register_communicating_agent(self.source, Fisherman)
+        d.register_communicating_agent(self.target, Fisherman)
+        return d
+
+    def test_all(self):
+        d = self.directory("all")
+        first = self.send(d, 3)
+        messages, recording = self.record(d, 4)
+        self.assertEqual(messages, recording)
+        self.assertEqual(first + messages, list(d._log))
+        self.assertEqual(first + messages, self.target.received)
+
+    def test_off(self):
+        d = self.directory("off")
+        messages, recording = self.record(d, 4)
+        self.assertEqual([], recording)
+        self.assertEqual(0, len(d._log))
+        self.assertEqual(4, d._log.count())
+        self.assertEqual(messages, self.target.received)
+
+    def test_ring(self):
+        d = self.directory("ring", 3)
+        messages, recording = self.record(d, 2)
+        self.assertEqual(messages, recording)
+        messages, recording = self.record(d, 5)
+        self.assertEqual(messages[-3:], recording)
+        self.assertEqual(messages[-3:], list(d._log))
+        self.assertEqual(3, d.new_message_log().size)
+
+    def test_phase(self):
+        d = self.directory("phase")
+        agent_log = d.new_message_log()
+        agent_log.append("entry")
+        self.send(d, 3)
+        messages, recording = self.record(d, 2)
+        self.assertEqual(messages, recording)
+        self.assertEqual(messages, list(d._log))
+        self.assertEqual(0, len(agent_log))
+
+    def test_ring_needs_size(self):
+        self.assertRaises(AssertionError, directory.Directory, "ring")
+        self.assertRaises(AssertionError, directory.Directory, "none")
+
+    def test_since(self):
+        log = directory.MessageLog("ring", 2)
+        for i in xrange(5):
+            log.append(i)
+        self.assertEqual([3, 4], log.since(1))
+        self.assertEqual([4], log.since(4))
+        self.assertEqual([], log.since(5))
+
+if __name__ == '__main__':
+    unittest.main()
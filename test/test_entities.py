@@ -0,0 +1,67 @@
+import entities
+import unittest
+
+class Cell(object):
+    def __init__(self, blocked=False):
+        self.blocked = blocked
+
+    def is_blocked(self):
+        return self.blocked
+
+class SlotKnowledgeTest(unittest.TestCase):
+    def setUp(self):
+        self.cells = [Cell() for _ in xrange(5)]
+        self.knowledge = entities.SlotKnowledge(
+            dict(zip(self.cells, [0.1, 0.5, 0.3, None, 0.2])))
+
+    def test_best_unblocked(self):
+        self.assertIs(self.cells[1], self.knowledge.best_unblocked())
+        self.cells[1].blocked = True
+        self.assertIs(self.cells[2], self.knowledge.best_unblocked())
+        self.knowledge[self.cells[0]] = 0.9
+        self.assertIs(self.cells[0], self.knowledge.best_unblocked())
+        self.knowledge[self.cells[0]] = 0.0
+        self.assertIs(self.cells[2], self.knowledge.best_unblocked())
+        del self.knowledge[self.cells[2]]
+        self.assertIs(self.cells[4], self.knowledge.best_unblocked())
+        for cell in self.cells:
+            cell.blocked = True
+        self.assertIsNone(self.knowledge.best_unblocked())
+
+    def test_rebuild(self):
+        for i in xrange(1000):
+            self.knowledge[self.cells[i % 5]] = i / 1000.0
+        self.assertLessEqual(len(self.knowledge._heap), 
+            2 * len(self.knowledge) + 17)
+        self.assertIs(self.cells[4], self.knowledge.best_unblocked())
+        self.cells[4].blocked = True
+        self.knowledge[self.cells[0]] = 0.0
+        self.knowledge._rebuild()
+        self.assertEqual(4, len(self.knowledge._heap))
+        self.assertIs(self.cells[3], self.knowledge.best_unblocked())
+
+    def test_dict_methods(self):
+        version = self.knowledge.version
+        self.knowledge.update({self.cells[3]: 0.8})
+        self.assertIs(self.cells[3], self.knowledge.best_unblocked())
+        self.assertEqual(0.8, self.knowledge.setdefault(self.cells[3], 0.0))
+        other = Cell()
+        self.assertEqual(0.95, self.knowledge.setdefault(other, 0.95))
+        self.assertIs(other, self.knowledge.best_unblocked())
+        self.assertEqual(0.95, self.knowledge.pop(other))
+        self.assertEqual(None, self.knowledge.pop(other, None))
+        self.assertRaises(KeyError, self.knowledge.pop, other)
+        self.assertIs(self.cells[3], self.knowledge.best_unblocked())
+        cell, quality = self.knowledge.popitem()
+        self.assertFalse(cell in self.knowledge)
+        self.assertIsNot(cell, self.knowledge.best_unblocked())
+        self.assertGreater(self.knowledge.version, version)
+        version = self.knowledge.version
+        self.knowledge.clear()
+        self.assertGreater(self.knowledge.version, version)
+        self.assertIsNone(self.knowledge.best_unblocked())
+        self.knowledge[self.cells[0]] = 0.5
+        self.assertIs(self.cells[0], self.knowledge.best_unblocked())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+import ga
+import entities
+import plan
+import collections
+import numpy
+import random
+import unittest
+
+class SelectionTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+
+    def proportions(self, selected, n):
+        counts = collections.Counter(selected)
+        return [counts[i] / float(len(selected)) for i in xrange(n)]
+
+    def test_rank_selection_weights(self):
+        selected = ga.Evolution.rank_selection(range(4), 40000)
+        for p, expected in zip(self.proportions(selected, 4), [1, 2, 3, 4]):
+            self.assertAlmostEqual(p, expected / 10.0, delta=0.01)
+
+    def test_stochastic_universal_sampling_counts(self):
+        selected = ga.Evolution.stochastic_universal_sampling(range(4), 10)
+        self.assertEqual(collections.Counter(selected),
+            {0: 1, 1: 2, 2: 3, 3: 4})
+
+    def test_tournament_selection_weights(self):
+        selected = ga.Evolution.tournament_selection(range(4), 40000, 2)
+        for p, expected in zip(self.proportions(selected, 4), [1, 3, 5, 7]):
+            self.assertAlmostEqual(p, expected / 16.0, delta=0.01)
+
+    def test_empty(self):
+        self.assertEqual(ga.Evolution.rank_selection([], 3), [])
+        self.assertEqual(ga.Evolution.stochastic_universal_sampling([1], 0), [])
+
+class MatingSchemeTest(unittest.TestCase):
+    def test_random_pairs_are_disjoint(self):
+        pairs = ga.Evolution.random_pairs(11)
+        self.assertEqual(5, len(pairs))
+        indices = [i for pair in pairs for i in pair]
+        self.assertEqual(len(indices), len(set(indices)))
+        self.assertTrue(set(indices) <= set(range(11)))
+
+    def test_all_pairs(self):
+        self.assertEqual(45, len(list(ga.Evolution.all_pairs(10))))
+
+    def test_default_is_all_pairs(self):
+        cfg = {
+            "phenotype class": None,
+            "genotype class": None,
+            "elitism": 0,
+            "selection mechanism": "rank",
+            "crossover rate": 0.5,
+            "mutation rate": 0.1,
+            "genome mutation rate": 0.1
+        }
+        self.assertIs(ga.Evolution.all_pairs, 
+            ga.EvolutionConfig.from_dict(cfg).mating_scheme)
+        cfg["mating scheme"] = "random pairs"
+        self.assertIs(ga.Evolution.random_pairs, 
+            ga.EvolutionConfig.from_dict(cfg).mating_scheme)
+
+class Genotype(ga.Genotype):
+    length = 10
+
+class GenotypeTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+
+    def test_bits(self):
+        genotype = Genotype.from_bits("0100000011")
+        self.assertEqual(2 ** 8 + 3, genotype.genome)
+        self.assertEqual("0100000011", genotype.to_bit_string())
+        self.assertEqual(genotype.genome, 
+            Genotype.from_bits([0, 1, 0, 0, 0, 0, 0, 0, 1, 1]).genome)
+        for _ in xrange(100):
+            genotype = Genotype.random()
+            self.assertEqual(genotype.genome, 
+                Genotype.from_bits(genotype.to_bit_string()).genome)
+
+    def test_mutation_flips_one_bit(self):
+        for seed in xrange(20):
+            genotype = Genotype.random()
+            bits = list(genotype.to_bit_string())
+            random.seed(seed)
+            random.random()
+            point = int(random.random() * len(genotype))
+            bits[point] = "1" if bits[point] == "0" else "0"
+            random.seed(seed)
+            genotype.mutate(1.0, 1.0)
+            self.assertEqual("".join(bits), genotype.to_bit_string())
+
+    def test_no_mutation(self):
+        genotype = Genotype.random()
+        genome = genotype.genome
+        genotype.mutate(0.0, 1.0)
+        self.assertEqual(genome, genotype.genome)
+
+    def test_crossover(self):
+        for seed in xrange(20):
+            first, second = Genotype.random(), Genotype.random()
+            random.seed(seed)
+            point = int(random.random() * len(first))
+            random.seed(seed)
+            children = Genotype.crossover(first, second, 1.0)
+            parents = [first.to_bit_string(), second.to_bit_string()]
+            for i, child in enumerate(children):
+                for j, bit in enumerate(child.to_bit_string()):
+                    self.assertEqual(parents[(i + (j >= point)) % 2][j], bit)
+
+    def test_no_crossover(self):
+        first, second = Genotype.random(), Genotype.random()
+        self.assertEqual((first, second), 
+            Genotype.crossover(first, second, 0.0))
+
+class DecodeTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+
+    def test_bit_arrays(self):
+        for _ in xrange(100):
+            genotype = Genotype.random()
+            bits = genotype.to_bit_string()
+            self.assertEqual([int(b) for b in bits], 
+                list(genotype.to_bit_array()))
+            self.assertEqual([int(bits[i:i + 3], 2) for i in xrange(0, 9, 3)],
+                list(genotype.to_unsigned_array(3)))
+
+    def test_number_list(self):
+        genotype_class = ga.FishermanNNGenotype
+        low, high = genotype_class.weight_range
+        precision = genotype_class.precision
+        for _ in xrange(20):
+            genotype = genotype_class.random()
+            bits = genotype.to_bit_string()
+            expected = [low + int(bits[i:i + precision], 2) / 
+                2.0 ** precision * (high - low) 
+                    for i in xrange(0, len(bits), precision)]
+            self.assertEqual(expected, genotype.to_number_list())
+
+    def test_cached_networks_are_copies(self):
+        genotype = ga.FishermanNNGenotype.random()
+        first = ga.FishermanVotingNN.from_genotype(genotype)
+        second = ga.FishermanVotingNN.from_genotype(genotype)
+        template = first._network_template(genotype.genome)
+        networks = [template, first.network, second.network]
+        values = [n.values.copy() for n in networks]
+        first.network.set_input_vector(numpy.ones(3))
+        first.network.update()
+        self.assertFalse(numpy.array_equal(values[1], first.network.values))
+        for network, value in zip(networks[::2], values[::2]):
+            self.assertTrue(numpy.array_equal(value, network.values))
+            self.assertFalse(set(network.neurons()) & 
+                set(first.network.neurons()))
+        def change_weights():
+            first.network.weights[0, 0] = 1.0
+        self.assertRaises(ValueError, change_weights)
+
+class Cell(object):
+    def __init__(self, position):
+        self.position = position
+
+    def get_position(self, world_map):
+        return self.position
+
+    def is_blocked(self):
+        return False
+
+class WorldMap(object):
+    def __init__(self, distances):
+        self.distances = distances
+
+    def get_normalized_distances_from(self, cell):
+        return self.distances
+
+class Agent(object):
+    def __init__(self, home, cells):
+        self.home = home
+        self.slot_knowledge = entities.SlotKnowledge(
+            {cell: random.random() for cell in cells})
+        self.decision_mechanism = ga.FishermanVotingNN.from_genotype(
+            ga.FishermanNNGenotype.random())
+
+class PreparedHearingTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.cells = [Cell((x, y)) for x in xrange(4) for y in xrange(4)]
+        self.world_map = WorldMap(numpy.random.RandomState(0).rand(4, 4))
+        self.plan = plan.CoastalPlan(
+            {cell: plan.AQUACULTURE_SITE for cell in self.cells[4:10]})
+        self.agents = [Agent(cell, self.cells) for cell in self.cells[:4]]
+
+    def hear(self, agent):
+        """Returns the complaint cells and network state of a hearing, 
+        evaluated by the agent's network alone."""
+        mechanism = agent.decision_mechanism
+        network, prepared = mechanism.network, mechanism._prepared_hearing
+        mechanism.network = network.copy()
+        mechanism._prepared_hearing = None
+        try:
+            votes = mechanism.decide_votes(agent, self.plan, self.world_map, 
+                None)
+            return [v.cell for v in votes], mechanism.network.values
+        finally:
+            mechanism.network = network
+            mechanism._prepared_hearing = prepared
+
+    def assert_hears(self, agent, expected):
+        cells, values = expected
+        votes = agent.decision_mechanism.decide_votes(agent, self.plan, 
+            self.world_map, None)
+        self.assertEqual(cells, [v.cell for v in votes])
+        self.assertTrue(numpy.allclose(values, 
+            agent.decision_mechanism.network.values))
+
+    def test_prepared_matches_per_agent(self):
+        expected = [self.hear(agent) for agent in self.agents]
+        ga.FishermanVotingNN.prepare_hearing(self.agents, self.plan, 
+            self.world_map)
+        for agent, e in zip(self.agents, expected):
+            self.assertTrue(agent.decision_mechanism._prepared_hearing
+                .valid_for(agent, self.plan))
+            self.assert_hears(agent, e)
+
+    def test_changed_plan_falls_back(self):
+        ga.FishermanVotingNN.prepare_hearing(self.agents, self.plan, 
+            self.world_map)
+        self.plan[self.cells[10]] = plan.AQUACULTURE_SITE
+        for agent in self.agents:
+            prepared = agent.decision_mechanism._prepared_hearing
+            self.assertFalse(prepared.valid_for(agent, self.plan))
+            expected = self.hear(agent)
+            self.assertFalse(numpy.allclose(prepared.state, expected[1]))
+            self.assert_hears(agent, expected)
+
+    def test_changed_knowledge_falls_back(self):
+        ga.FishermanVotingNN.prepare_hearing(self.agents, self.plan, 
+            self.world_map)
+        agent = self.agents[0]
+        agent.slot_knowledge[self.cells[4]] = 10.0
+        prepared = agent.decision_mechanism._prepared_hearing
+        self.assertFalse(prepared.valid_for(agent, self.plan))
+        self.assertTrue(self.agents[1].decision_mechanism._prepared_hearing
+            .valid_for(self.agents[1], self.plan))
+        expected = self.hear(agent)
+        self.assertFalse(numpy.allclose(prepared.state, expected[1]))
+        self.assert_hears(agent, expected)
+
+    def test_reuses_rows_before_changed_site(self):
+        ga.FishermanVotingNN.prepare_hearing(self.agents, self.plan, 
+            self.world_map)
+        agent = self.agents[0]
+        mechanism = agent.decision_mechanism
+        sites = self.plan.aquaculture_sites()
+        agent.slot_knowledge[sites[3]] = 10.0
+        inputs = mechanism.hearing_inputs(agent, sites, self.world_map)
+        self.assertEqual(3, mechanism._prepared_hearing.reusable_rows(
+            agent, sites, inputs, mechanism.network.values))
+        self.assertEqual(0, mechanism._prepared_hearing.reusable_rows(
+            agent, sites, inputs, mechanism.network.values + 1.0))
+        self.assertEqual(0, mechanism._prepared_hearing.reusable_rows(
+            self.agents[1], sites, inputs, mechanism.network.values))
+        self.assert_hears(agent, self.hear(agent))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import log
+import numpy
+import os
+import shutil
+import tempfile
+import unittest
+
+class LogFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "test.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def contents(self):
+        with open(self.filename) as file:
+            return file.read()
+
+    def test_flush_every_rows(self):
+        f = log.LogFile(self.filename, "a,b\n", "2")
+        f.write("1,2\n")
+        self.assertEqual("", self.contents())
+        f.write("3,4\n")
+        self.assertEqual("a,b\n1,2\n3,4\n", self.contents())
+        f.close()
+
+    def test_flush_on_round_end(self):
+        f = log.LogFile(self.filename, "a,b\n")
+        f.write("1,2\n")
+        f.end_round()
+        self.assertEqual("a,b\n1,2\n", self.contents())
+        f.write("5,6\n")
+        f.close()
+        self.assertEqual("a,b\n1,2\n5,6\n", self.contents())
+
+class StatisticsLoggerTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def read(self, filename):
+        with open(filename) as file:
+            return file.read().splitlines()
+
+    def test_long_and_wide_format(self):
+        with log.StatisticsLogger() as logger:
+            logger.add_phase_statistics(0, {"a": {"value": 1.0}})
+            logger.add_phase_statistics(0, {"a": {"value": 2.0}})
+            logger.write_round(0)
+            logger.add_phase_statistics(1, {"b": {"value": 5.0}})
+            logger.add_phase_statistics(1, 
+                {"a": {"value": 4.0, "mode": "set"}})
+            logger.write_round(1)
+            logger.end_round()
+            self.assertEqual(["round,key,value", "0,a,3.0000000000", 
+                "1,a,4.0000000000", "1,b,5.0000000000"],
+                self.read(log.StatisticsLogger.LONG_FILENAME))
+            logger.add_phase_statistics(2, {"a": {"value": 1.0}})
+        self.assertEqual(["round,a,b", 
+            "0.0000000000,3.0000000000,",
+            "1.0000000000,4.0000000000,5.0000000000"],
+            self.read(log.StatisticsLogger.FILENAME))
+
+class RunArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_table_columns(self):
+        table = log.ArchiveTable("t", [("n", int)])
+        for i in xrange(100):
+            table.append({"n": i})
+        table.append({"n": 100, "x": 0.5})
+        table.append({"x": 1.5})
+        self.assertEqual(range(101) + [0], list(table["n"]))
+        self.assertTrue(numpy.isnan(table["x"][:100]).all())
+        self.assertEqual([0.5, 1.5], list(table["x"][100:]))
+
+    def test_save_and_load(self):
+        archive = log.RunArchive(os.path.join(self.directory, "archive"))
+        archive.add_statistics(0, {"a, b": 2.0})
+        archive.add_vote_fitness_relation(0, "x", 3, 0.25)
+        archive.add_vote_fitness_relation(0, "y", 1, 0.5)
+        archive.add_vote_fitness_relation(1, "x", 2, 0.75)
+        archive.save()
+        loaded = log.RunArchive.load(archive.directory)
+        self.assertIsInstance(loaded["agents"]["fitness"], numpy.memmap)
+        self.assertEqual([0.25, 0.5, 0.75], list(loaded["agents"]["fitness"]))
+        self.assertEqual(["x", "y", "x"], 
+            list(loaded["agent ids"][loaded["agents"]["agent"]]))
+        self.assertEqual([2.0], list(loaded["statistics"]["a b"]))
+        self.assertEqual(0, len(loaded["rounds"]["num"]))
+
+    def test_periodic_save(self):
+        archive = log.RunArchive(os.path.join(self.directory, "archive"), 2)
+        logger = log.StatisticsLogger(archive=archive, 
+            directory=self.directory)
+        for round in xrange(3):
+            logger.add_phase_statistics(round, {"a": {"value": 1.0}})
+            logger.write_round(round)
+            logger.end_round()
+        loaded = log.RunArchive.load(archive.directory)
+        self.assertEqual([0, 1], list(loaded["statistics"]["round"]))
+        logger.close()
+        loaded = log.RunArchive.load(archive.directory)
+        self.assertEqual([0, 1, 2], list(loaded["statistics"]["round"]))
+
+class AsyncWriterTest(unittest.TestCase):
+    def test_runs_in_order_and_flushes_on_close(self):
+        done = []
+        writer = log.AsyncWriter(4)
+        for i in xrange(100):
+            writer.submit(done.append, i)
+        writer.close()
+        self.assertEqual(range(100), done)
+
+    def test_errors_are_raised(self):
+        done = []
+        writer = log.AsyncWriter()
+        writer.submit(int, "x")
+        writer.submit(done.append, 1)
+        self.assertRaises(ValueError, writer.flush)
+        writer.close()
+        self.assertEqual([1], done)
+
+    def test_files_are_closed_after_error(self):
+        directory = tempfile.mkdtemp()
+        try:
+            logger = log.Logger.new(writer=log.AsyncWriter(), 
+                directory=directory)
+            logger.add_phase_statistics(0, {"a": {"value": 1.0}})
+            logger.write_round(0)
+            logger._writer.submit(lambda: 1 / 0)
+            self.assertRaises(ZeroDivisionError, logger.close)
+            self.assertTrue(logger._vfr_file.closed)
+            with open(logger.path(log.StatisticsLogger.FILENAME)) as file:
+                self.assertEqual(2, len(file.readlines()))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_statistics_logger(self):
+        cwd = os.getcwd()
+        directory = tempfile.mkdtemp()
+        os.chdir(directory)
+        try:
+            with log.StatisticsLogger(writer=log.AsyncWriter()) as logger:
+                for round in xrange(3):
+                    logger.add_phase_statistics(round, 
+                        {"a": {"value": round}})
+                    logger.write_round(round)
+                    logger.end_round()
+            with open(log.StatisticsLogger.LONG_FILENAME) as file:
+                self.assertEqual(4, len(file.readlines()))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(directory)
+
+class LoggerDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_files_are_written_in_directory(self):
+        directory = os.path.join(self.directory, "runs", "1")
+        with log.Logger.new(directory=directory):
+            pass
+        self.assertEqual(sorted([log.vote_fitness_relation_filename,
+            log.RoundStatistics.filename, log.StatisticsLogger.FILENAME,
+            log.StatisticsLogger.LONG_FILENAME]), sorted(os.listdir(directory)))
+
+if __name__ == '__main__':
+    unittest.main()
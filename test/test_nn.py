@@ -0,0 +1,118 @@
+import nn
+import math
+import numpy
+import random
+import unittest
+
+class BatchUpdateTest(unittest.TestCase):
+    inputs = ["x", "y"]
+    hiddens = ["A", "B", "C"]
+    outputs = ["out"]
+
+    def network(self, seed):
+        rng = random.Random(seed)
+        edges = [((a, b), rng.uniform(-1, 1)) for a in self.inputs
+            for b in self.hiddens] + \
+            [((a, "out"), rng.uniform(-1, 1)) for a in self.hiddens] + \
+            [((a, a), rng.uniform(-1, 1)) for a in self.hiddens] + \
+            [(("bias", a), rng.uniform(-1, 1)) for a in self.hiddens]
+        return nn.LabeledNeuralNetwork(
+            self.inputs, self.outputs, self.hiddens, edges)
+
+    def test_batch_matches_sequential(self):
+        rows = numpy.random.rand(20, 2)
+        for seed in xrange(10):
+            sequential, batched = self.network(seed), self.network(seed)
+            expected = []
+            for row in rows:
+                sequential.set_input_values(
+                    dict(zip(sequential.input_labels, map(float, row))))
+                sequential.update()
+                expected.append(sequential.get_output("out"))
+            outputs = batched.update_batch(rows)[:, 0]
+            for a, b in zip(expected, outputs):
+                self.assertAlmostEqual(a, b)
+            self.assertAlmostEqual(
+                sequential.get_output("out"), batched.get_output("out"))
+
+    def test_population_matches_batch(self):
+        inputs = numpy.random.rand(5, 20, 2)
+        networks = [self.network(seed) for seed in xrange(5)]
+        for network in networks:
+            network.update_batch(numpy.random.rand(3, 2))
+        start = [network.values.copy() for network in networks]
+        self.assertTrue(nn.population_compatible(networks))
+        outputs, states = nn.evaluate_population(networks, inputs)
+        __, values = nn.evaluate_population(networks, inputs, True)
+        self.assertEqual((5, 20, len(networks[0].values)), values.shape)
+        self.assertTrue(numpy.array_equal(states, values[:, -1]))
+        for i, network in enumerate(networks):
+            self.assertTrue(numpy.array_equal(start[i], network.values))
+            expected = network.copy().update_batch(inputs[i])
+            self.assertTrue(numpy.allclose(expected, outputs[i]))
+            sequential = network.copy()
+            for row in inputs[i]:
+                sequential.set_input_vector(row)
+                sequential.update()
+            self.assertTrue(numpy.allclose(sequential.values, states[i]))
+
+    def test_empty_batch(self):
+        network = self.network(0)
+        self.assertEqual((0, 1), network.update_batch(
+            numpy.empty((0, 2))).shape)
+
+    def test_copy(self):
+        network = self.network(0)
+        copy = network.copy()
+        copy.set_input_values({"x": 0.5, "y": -0.5})
+        copy.update()
+        self.assertEqual(0.0, network.get_output("out"))
+        self.assertNotEqual(0.0, copy.get_output("out"))
+        labels = dict(zip(network.neurons(), network.labels()))
+        copy_labels = dict(zip(copy.neurons(), copy.labels()))
+        self.assertEqual(
+            {labels[a]: {labels[b]: network.edges[a][b] for b in network.edges[a]}
+                for a in network.edges},
+            {copy_labels[a]: {copy_labels[b]: copy.edges[a][b]
+                for b in copy.edges[a]} for a in copy.edges})
+
+class CompiledNetworkTest(unittest.TestCase):
+    def test_update_stages(self):
+        weights = numpy.zeros((5, 5))
+        weights[0, 1] = weights[1, 3] = weights[2, 2] = 0.5
+        self.assertEqual([[0], [1, 2], [3, 4]], 
+            nn.update_stages(range(5), weights))
+        self.assertEqual([[4, 3, 2, 1, 0]], 
+            nn.update_stages(range(4, -1, -1), weights))
+        self.assertEqual([[4, 2, 1], [3]], 
+            nn.update_stages([4, 2, 1, 3], weights))
+
+    def test_matches_hand_computed(self):
+        edges = [
+            (("x", "A"), 0.5), (("y", "A"), -1.0), (("x", "B"), 2.0),
+            (("A", "A"), 0.25), (("A", "B"), -0.5), (("B", "out"), 1.5),
+            (("A", "out"), -2.0), (("bias", "A"), 0.75), (("bias", "B"), 1.0)
+        ]
+        network = nn.LabeledNeuralNetwork(["x", "y"], ["out"], ["A", "B"], 
+            edges)
+        # Neurons are updated one at a time, each seeing the new values of
+        # the neurons before it. The bias neuron starts at -1.0 and is
+        # updated like the other hidden neurons.
+        values = {"x": 0.0, "y": 0.0, "A": 0.0, "B": 0.0, "out": 0.0,
+            "bias": -1.0}
+        weights = dict(edges)
+        order = network.hiddens.keys() + network.outputs.keys()
+        for x, y in [(1.0, 0.0), (0.5, -0.5), (0.0, 2.0)]:
+            values["x"], values["y"] = x, y
+            for n in order:
+                total = sum(values[m] * weights.get((m, n), 0.0) 
+                    for m in values)
+                values[n] = 1 / (1 + math.exp(-total))
+            network.set_input_values({"x": x, "y": y})
+            network.update()
+            neurons = dict(zip(network.labels(), network.neurons()))
+            for label in values:
+                self.assertAlmostEqual(values[label], neurons[label].value)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import plan
+import unittest
+
+class Cell(object):
+    def __init__(self, blocked=False):
+        self.blocked = blocked
+
+    def is_blocked(self):
+        return self.blocked
+
+class CoastalPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.cells = [Cell() for _ in xrange(6)]
+        self.plan = plan.CoastalPlan(
+            {c: plan.AQUACULTURE_SITE for c in self.cells[:4]})
+
+    def test_entity_sets_follow_changes(self):
+        self.plan[self.cells[0]] = plan.RESERVED_ZONE
+        self.plan[self.cells[4]] = plan.AQUACULTURE_SITE
+        del self.plan[self.cells[1]]
+        self.assertEqual(set(self.cells[2:5]),
+            set(self.plan.aquaculture_sites()))
+        self.assertEqual([self.cells[0]], self.plan.reserved_zones())
+
+    def test_random_unblocked(self):
+        for c in self.cells[:3]:
+            c.blocked = True
+        for _ in xrange(10):
+            self.assertIs(self.cells[3],
+                self.plan.random_unblocked(plan.AQUACULTURE_SITE))
+        self.cells[3].blocked = True
+        self.assertIsNone(self.plan.random_unblocked(plan.AQUACULTURE_SITE))
+        self.plan[self.cells[5]] = plan.AQUACULTURE_SITE
+        self.assertIs(self.cells[5],
+            self.plan.random_unblocked(plan.AQUACULTURE_SITE))
+        self.assertIsNone(self.plan.random_unblocked(plan.RESERVED_ZONE))
+
+    def test_dict_methods(self):
+        sites = lambda: set(self.plan.aquaculture_sites())
+        version = self.plan.version
+        self.plan.update({self.cells[4]: plan.AQUACULTURE_SITE})
+        self.assertEqual(set(self.cells[:5]), sites())
+        self.assertGreater(self.plan.version, version)
+        self.assertIs(plan.AQUACULTURE_SITE, 
+            self.plan.setdefault(self.cells[0], plan.RESERVED_ZONE))
+        self.assertIs(plan.RESERVED_ZONE, 
+            self.plan.setdefault(self.cells[5], plan.RESERVED_ZONE))
+        self.assertEqual([self.cells[5]], self.plan.reserved_zones())
+        version = self.plan.version
+        self.assertIs(plan.AQUACULTURE_SITE, self.plan.pop(self.cells[0]))
+        self.assertIsNone(self.plan.pop(self.cells[0], None))
+        self.assertRaises(KeyError, self.plan.pop, self.cells[0])
+        self.assertEqual(set(self.cells[1:5]), sites())
+        self.assertGreater(self.plan.version, version)
+        version = self.plan.version
+        cell, entity = self.plan.popitem()
+        self.assertFalse(cell in self.plan)
+        self.assertFalse(cell in sites() or cell in self.plan.reserved_zones())
+        self.assertGreater(self.plan.version, version)
+        self.plan.random_unblocked(plan.AQUACULTURE_SITE)
+        version = self.plan.version
+        self.plan.clear()
+        self.assertGreater(self.plan.version, version)
+        self.assertEqual([], self.plan.aquaculture_sites())
+        self.assertIsNone(self.plan.random_unblocked(plan.AQUACULTURE_SITE))
+
+if __name__ == '__main__':
+    unittest.main()
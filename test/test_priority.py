@@ -0,0 +1,53 @@
+import agent
+import priority
+import unittest
+
+class SharedInfluencesTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        def shared(influences):
+            self.calls.append("shared")
+            return 2.0
+        def own(influences):
+            self.calls.append("own")
+            return influences.agent
+        self.shared = priority.Priority("Shared", shared)
+        self.own = priority.Priority("Own", own, True)
+
+    def test_agent_independent_values_are_shared(self):
+        influences = priority.SharedInfluences()
+        for agent in [1.0, 3.0]:
+            copy = influences.copy_for(agent)
+            self.assertEqual(2.0, copy.value_of(self.shared))
+            self.assertEqual(agent, copy.value_of(self.own))
+        self.assertEqual(["shared", "own", "own"], self.calls)
+
+    def test_plain_influences_calculate_every_value(self):
+        influences = priority.Influences(1.0)
+        influences.value_of(self.shared)
+        influences.value_of(self.shared)
+        self.assertEqual(["shared", "shared"], self.calls)
+
+class PrioritiesSatisfactionTest(unittest.TestCase):
+    class Agent(agent.PrioritizingAgent):
+        def __init__(self, capital, priorities):
+            self.capital = capital
+            self.set_priorities(priorities)
+
+    def test_matches_agent_satisfaction(self):
+        constant = priority.Priority("Constant", lambda influences: 4.0)
+        agents = [
+            self.Agent(1.0, {priority.OwnProfits: 2.0, constant: 1.0}),
+            self.Agent(7.0, {priority.OwnProfits: 1.0}),
+            self.Agent(5.0, {constant: 3.0}),
+            self.Agent(5.0, {constant: 0.0})
+        ]
+        satisfaction = priority.priorities_satisfaction(
+            agents, priority.SharedInfluences())
+        for a in agents:
+            self.assertAlmostEqual(satisfaction[a],
+                a.get_priorities_satisfaction(priority.Influences(a)))
+        self.assertEqual(1.0, satisfaction[agents[3]])
+
+if __name__ == '__main__':
+    unittest.main()
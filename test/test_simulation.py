@@ -0,0 +1,32 @@
+from FisherSimulation import simulation
+import os
+import shutil
+import tempfile
+import unittest
+
+class SimulationTest(unittest.TestCase):
+    def test_last_round_statistics(self):
+        directory = tempfile.mkdtemp()
+        s = simulation.Simulation()
+        try:
+            s.setup_config("config/config.js")
+            s.initialize(directory)
+            while s.get_round_number() < 2:
+                s.step()
+            statistics = s.get_last_round_statistics()
+        finally:
+            s.close()
+        try:
+            with open(os.path.join(directory, "statistics.csv")) as file:
+                lines = file.read().splitlines()
+            self.assertEqual(3, len(lines))
+            names = lines[0].split(",")
+            self.assertEqual(set(names), set(statistics))
+            self.assertEqual(1, statistics["round"])
+            for name, value in zip(names, lines[-1].split(",")):
+                self.assertAlmostEqual(float(value), statistics[name])
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
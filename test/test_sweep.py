@@ -0,0 +1,50 @@
+from FisherSimulation import sweep
+import os
+import shutil
+import tempfile
+import unittest
+
+class SweepTest(unittest.TestCase):
+    def test_runs(self):
+        runs = sweep.sweep_runs([("a.b", [1, 2]), ("c", ["x", "y", "z"])], 
+            2, "out", 10)
+        self.assertEqual(12, len(runs))
+        self.assertEqual(range(10, 22), [r.seed for r in runs])
+        self.assertEqual(len(runs), len(set(r.output_directory for r in runs)))
+        self.assertEqual({"a.b": 2, "c": "z"}, runs[-1].values)
+        self.assertEqual([0, 1], [r.replicate for r in runs[:2]])
+
+    def test_table(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, sweep.TABLE_FILENAME)
+            runs = sweep.sweep_runs([("a", [0.5])], 2, directory)
+            sweep.write_table(filename, ["a"], runs, 
+                [{"round": 3, "x": 1.0}, {"round": 3, "y": 2.0}])
+            with open(filename) as file:
+                self.assertEqual([
+                    "run,replicate,seed,round,a,x,y",
+                    "0,0,0,3,0.5000000000,1.0000000000,",
+                    "1,1,1,3,0.5000000000,,2.0000000000"
+                ], file.read().splitlines())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_sweep(self):
+        directory = tempfile.mkdtemp()
+        try:
+            results = sweep.sweep("config/config.js", 
+                [("global.aquaculture damage proportion", [0.1])], 2, 1, 
+                directory, processes=2)
+            self.assertEqual([0, 1], [run.number for run, __ in results])
+            self.assertEqual([0, 0], [s["round"] for __, s in results])
+            for run, __ in results:
+                self.assertTrue(os.path.isfile(os.path.join(
+                    run.output_directory, "statistics.csv")))
+            with open(os.path.join(directory, sweep.TABLE_FILENAME)) as file:
+                self.assertEqual(3, len(file.readlines()))
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
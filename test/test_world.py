@@ -1,34 +1,191 @@
 import world
 import unittest
 
+class StructureConfig(dict):
+    def __init__(self, dictionary, globals):
+        dict.__init__(self, dictionary)
+        self.globals = globals
+
+def structure_config(w, h, cell_size):
+    return StructureConfig({
+        "width":        w,
+        "height":       h,
+        "cell width":   cell_size[0],
+        "cell height":  cell_size[1]
+    }, {
+        "aquaculture blocking radius":      25,
+        "aquaculture damage radius":        50,
+        "aquaculture damage proportion":    1
+    })
+
 class TorusStructureTest(unittest.TestCase):
     def setUp(self):
         self.w = 10
         self.h = 10
         self.cell_size = (5, 5)
         self.good_spot_frequency = 0.1
-        self.torus_structure = world.TorusStructure(self.w, self.h, self.cell_size, self.good_spot_frequency)
-        self.torus_structure_moore = world.TorusStructure(self.w, self.h,self.cell_size, self.good_spot_frequency, neighborhood_type="moore")
-        self.torus_structure_von_neumann = world.TorusStructure(self.w, self.h, self.cell_size, self.good_spot_frequency, neighborhood_type="von_neumann")
-        
+        self.torus_structure = world.TorusStructure(
+            structure_config(self.w, self.h, self.cell_size),
+            self.good_spot_frequency)
+
     def test_absolute(self):
         self.assertEqual((1, 1), self.torus_structure._absolute(1, 1))
         self.assertEqual((self.w - 1, 1), self.torus_structure._absolute(-1, 1))
         self.assertEqual((0, 1), self.torus_structure._absolute(- self.w * 3, 1))
         self.assertEqual((1, self.h - 1), self.torus_structure._absolute(self.w + 1, -1))
-        
+
     def test_coordinates(self):
         self.assertEqual(
-            set([self.torus_structure._slots[x][y] for (x, y) in
-            (1, 0), (9, 0), (0, 1), (0, 9), (1, 1), (1, 9), (9, 1), (9, 9), (1, 0), 
-             (9, 0), (0, 2), (0, 8), (1, 2), (1, 8), (9, 2), (9, 8), (2, 0), (8, 0), 
-             (0, 1), (0, 9), (2, 1), (2, 9), (8, 1), (8, 9), (2, 0), (8, 0), (0, 2), 
-             (0, 8), (2, 2), (2, 8), (8, 2), (8, 8)]), 
+            set([self.torus_structure.slots[x][y] for (x, y) in
+            (1, 0), (9, 0), (0, 1), (0, 9), (1, 1), (1, 9), (9, 1), (9, 9),
+            (2, 0), (8, 0), (0, 2), (0, 8)]),
             set(self.torus_structure.get_radius(10, (0, 0))))
         self.assertEqual(
-            self.torus_structure.get_radius(11, (0, 0)), 
+            self.torus_structure.get_radius(11, (0, 0)),
             self.torus_structure.get_radius(10, (0, 0)))
         self.assertEqual([], self.torus_structure.get_radius(0, (0, 0)))
-        
+
+    def test_radius_offsets_cached(self):
+        self.assertIs(
+            self.torus_structure.get_radius_offsets(10),
+            self.torus_structure.get_radius_offsets(10))
+        self.assertEqual(12, len(self.torus_structure.get_radius(10, (5, 5))))
+
+class CellPositionTest(unittest.TestCase):
+    def setUp(self):
+        self.structure = world.GridStructure(
+            structure_config(10, 10, (25, 25)), 0.1)
+
+    def test_position_index(self):
+        for (x, y) in self.structure.get_coordinates_list():
+            cell = self.structure.slots[x][y]
+            self.assertEqual((x, y), self.structure.get_cell_position(cell))
+            self.assertEqual((x, y),
+                cell.get_position(world.Map(self.structure)))
+
+    def test_unknown_cell(self):
+        self.assertEqual(None, self.structure.get_cell_position(world.Slot()))
+
+    def test_cell_distance(self):
+        a = self.structure.slots[0][0]
+        b = self.structure.slots[3][4]
+        self.assertAlmostEqual(125.0, self.structure.get_cell_distance(a, b))
+
+class ArrayStructureTest(unittest.TestCase):
+    def setUp(self):
+        self.structure = world.ArrayGridStructure(
+            structure_config(10, 10, (25, 25)), 0.1)
+        self.map = world.Map(self.structure)
+
+    def test_slots_are_views(self):
+        cell = self.structure.slots[2][3]
+        cell.block()
+        cell.inflict_damage(0.5)
+        self.assertTrue(self.structure.state.blocked[2, 3])
+        self.assertAlmostEqual(
+            self.structure.state.fish_quantity[2, 3], cell.get_fish_quantity())
+        self.assertEqual((2, 3), self.structure.get_cell_position(cell))
+
+    def test_slots_hold_no_cell_state(self):
+        cell = self.structure.slots[2][3]
+        self.assertEqual(["_free_cells", "_occupants", "_position", "_state"],
+            sorted(name for c in type(cell).__mro__ 
+                for name in getattr(c, "__slots__", ())))
+        self.assertFalse(hasattr(cell, "__dict__"))
+
+    def test_aggregates(self):
+        cells = self.map.get_all_cells()
+        cells[0].block()
+        cells[1].inflict_damage(0.3)
+        self.assertAlmostEqual(
+            sum(c.get_fish_quantity() for c in cells),
+            self.map.get_total_fish_quantity())
+        self.assertEqual(99, self.map.get_num_unblocked_cells())
+        self.assertEqual(10, len([c for c in cells if c.fish_spawning()]))
+
+class AquacultureDamageTest(unittest.TestCase):
+    def setUp(self):
+        self.grid = world.ArrayGridStructure(
+            structure_config(10, 10, (25, 25)), 0.1)
+        self.torus = world.ArrayTorusStructure(
+            structure_config(10, 10, (25, 25)), 0.1)
+
+    def test_falloff(self):
+        damage = self.grid.get_aquaculture_damage(self.grid.slots[5][5])
+        self.assertEqual(1.0, damage[self.grid.slots[5][5]])
+        self.assertAlmostEqual(0.5, damage[self.grid.slots[5][6]])
+        self.assertAlmostEqual(0.0, damage[self.grid.slots[5][7]])
+        self.assertFalse(self.grid.slots[6][7] in damage)
+
+    def test_grid_edges(self):
+        damage = self.grid.get_aquaculture_damage(self.grid.slots[0][0])
+        self.assertEqual(6, len(damage))
+
+    def test_torus_wraps(self):
+        damage = self.torus.get_aquaculture_damage(self.torus.slots[0][0])
+        self.assertAlmostEqual(0.5, damage[self.torus.slots[9][0]])
+        self.assertAlmostEqual(0.5, damage[self.torus.slots[0][9]])
+
+    def test_inflict_matches_damage(self):
+        for structure in (self.grid, self.torus):
+            cell = structure.slots[0][1]
+            damage = structure.get_aquaculture_damage(cell)
+            before = {c: c.get_fish_quantity() for c in damage}
+            damaged = structure.inflict_aquaculture_damage(cell)
+            self.assertEqual(set(damage), set(damaged))
+            for c in damage:
+                self.assertAlmostEqual(
+                    before[c] * (1 - damage[c]), c.get_fish_quantity())
+
+class DistanceCacheTest(unittest.TestCase):
+    def structures(self, mode):
+        for cls in (world.GridStructure, world.TorusStructure):
+            cfg = structure_config(8, 8, (25, 10))
+            if mode is not None:
+                cfg["distance cache"] = mode
+            yield cls(cfg, 0.1)
+
+    def test_cached_distances_match(self):
+        for mode in ("dense", "rows", "auto"):
+            for plain, cached in zip(self.structures(None),
+                    self.structures(mode)):
+                for a in ((0, 0), (3, 7), (7, 1)):
+                    for b in plain.get_coordinates_list():
+                        self.assertAlmostEqual(
+                            plain.get_distance(a, b),
+                            cached.get_distance(a, b))
+                        self.assertAlmostEqual(
+                            plain.get_distance(a, b),
+                            plain.get_distances_from(a)[b])
+
+    def test_max_distance(self):
+        for structure in self.structures("auto"):
+            world_map = world.Map(structure)
+            self.assertAlmostEqual(
+                structure.get_distance((0, 0), (7, 7)),
+                world_map.get_max_distance())
+
+class FreeCellsTest(unittest.TestCase):
+    def test_blocking_updates_free_cells(self):
+        for cls in (world.GridStructure, world.ArrayGridStructure):
+            structure = cls(structure_config(10, 10, (25, 25)), 0.1)
+            world_map = world.Map(structure)
+            cell = structure.slots[5][5]
+            changed = world_map.build_aquaculture(object(), cell)
+            free_cells = structure.get_free_cells()
+            self.assertEqual(world_map.get_num_unblocked_cells(),
+                len(free_cells))
+            self.assertFalse(cell in free_cells)
+            for c in changed:
+                self.assertEqual(not c.is_blocked(), c in free_cells)
+            for _ in xrange(50):
+                self.assertFalse(world_map.get_random_free_cell().is_blocked())
+
+    def test_all_blocked(self):
+        structure = world.GridStructure(structure_config(2, 2, (25, 25)), 0.1)
+        for c in structure.get_all_slots():
+            c.block()
+        self.assertEqual(None, world.Map(structure).get_random_free_cell())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file